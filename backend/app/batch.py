@@ -0,0 +1,83 @@
+import multiprocessing
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from backend.app.extraction import Extractor
+from backend.app.validators import validate_memory, ValidationError
+
+
+_worker_extractor: Optional[Extractor] = None
+
+
+def _init_worker(extractor_kwargs: Dict[str, Any]) -> None:
+    global _worker_extractor
+    _worker_extractor = Extractor(**extractor_kwargs)
+
+
+def _extract_one(extractor: Extractor, position: int, conversation: Dict[str, Any]) -> Dict[str, Any]:
+    user_id = conversation.get("user_id", "default_user")
+    try:
+        memory = extractor.extract(conversation["messages"], user_id=user_id)
+        validate_memory(memory)
+    except ValidationError as e:
+        return {"position": position, "user_id": user_id, "success": False, "error": str(e)}
+    except Exception as e:
+        return {"position": position, "user_id": user_id, "success": False, "error": f"Extraction failed: {e}"}
+    return {"position": position, "user_id": user_id, "success": True, "memory": memory}
+
+
+def _extract_in_worker(position: int, conversation: Dict[str, Any]) -> Dict[str, Any]:
+    return _extract_one(_worker_extractor, position, conversation)
+
+
+class BatchExtractor:
+
+    def __init__(self, workers: Optional[int] = None, max_pending: Optional[int] = None,
+                 extractor: Optional[Extractor] = None, **extractor_kwargs):
+        self.workers = multiprocessing.cpu_count() if workers is None else workers
+        self.max_pending = max_pending or max(self.workers, 1) * 4
+        self.extractor_kwargs = extractor_kwargs
+        self.extractor = extractor
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.pool_lock = threading.Lock()
+
+    def extract_many(self, conversations: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        if self.workers <= 0:
+            if self.extractor is None:
+                self.extractor = Extractor(**self.extractor_kwargs)
+            for position, conversation in enumerate(conversations):
+                yield _extract_one(self.extractor, position, conversation)
+            return
+
+        pool = self._get_pool()
+        pending = set()
+        for position, conversation in enumerate(conversations):
+            pending.add(pool.submit(_extract_in_worker, position, conversation))
+            if len(pending) >= self.max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+    def close(self) -> None:
+        with self.pool_lock:
+            if self.pool is not None:
+                self.pool.shutdown(cancel_futures=True)
+                self.pool = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self.pool_lock:
+            if self.pool is None:
+                # spawn rather than fork: the API server is multi-threaded.
+                self.pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.extractor_kwargs,),
+                )
+            return self.pool
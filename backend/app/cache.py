@@ -0,0 +1,175 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Hashable, Optional
+
+from backend.app.db import ProcessConnection
+
+
+def content_key(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+class LRUCache:
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class DiskCache:
+    # SQLite-backed string cache. Worker processes share entries through
+    # the file, each over its own connection; hit/miss counters are per
+    # process. Reads don't write: hits are remembered and their access times
+    # written with the next put, and the size limit is enforced every
+    # `evict_every` puts, so the table may run over it by that much per
+    # process in between.
+
+    def __init__(self, path: str, ttl: float = 86400, max_entries: int = 10000):
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.evict_every = max(1, max_entries // 100)
+        self.puts = 0
+        self.touched: Dict[bytes, float] = {}
+        self.db = ProcessConnection(path, self._create_tables)
+        self.lock = threading.Lock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        return self.db.get()
+
+    @staticmethod
+    def _create_tables(conn: sqlite3.Connection) -> None:
+        conn.execute("PRAGMA journal_mode=WAL")
+        # A lost write only costs a cache miss; in WAL mode NORMAL skips
+        # the fsync on every commit.
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_entries ("
+            "key BLOB PRIMARY KEY, value TEXT NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_by_access ON cache_entries (accessed_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_by_age ON cache_entries (created_at)")
+
+    def get(self, key: bytes) -> Optional[str]:
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT value FROM cache_entries WHERE key = ? AND created_at > ?", (key, now - self.ttl)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.touched[key] = now
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: bytes, value: str) -> None:
+        if self.max_entries <= 0 or self.ttl <= 0:
+            return
+        now = time.time()
+        with self.lock, self.conn:
+            if self.touched:
+                self.conn.executemany(
+                    "UPDATE cache_entries SET accessed_at = ? WHERE key = ?",
+                    [(accessed_at, touched) for touched, accessed_at in self.touched.items()],
+                )
+                self.touched.clear()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            self.evictions += self.conn.execute(
+                "DELETE FROM cache_entries WHERE created_at <= ?", (now - self.ttl,)
+            ).rowcount
+            self.puts += 1
+            if self.puts % self.evict_every == 0:
+                self._evict_excess()
+
+    def _evict_excess(self) -> None:
+        (size,) = self.conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()
+        excess = size - self.max_entries
+        if excess > 0:
+            self.conn.execute(
+                "DELETE FROM cache_entries WHERE key IN ("
+                "SELECT key FROM cache_entries ORDER BY accessed_at LIMIT ?)", (excess,)
+            )
+            self.evictions += excess
+
+    def clear(self) -> None:
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM cache_entries")
+            self.touched.clear()
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        size = len(self)
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": size,
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def close(self) -> None:
+        with self.lock:
+            self.db.close()
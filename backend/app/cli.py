@@ -0,0 +1,102 @@
+import argparse
+import json
+import sys
+import time
+from typing import Any, Dict, IO, Iterator, List, Optional
+
+from backend.app.batch import BatchExtractor
+
+
+class Progress:
+
+    def __init__(self, stream: IO[str], every: float):
+        self.stream = stream
+        self.every = every
+        self.started = time.monotonic()
+        self.last_report = self.started
+        self.bytes_read = 0
+        self.conversations = 0
+        self.messages = 0
+        self.written = 0
+        self.failed = 0
+        self.skipped = 0
+
+    def tick(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self.last_report < self.every:
+            return
+        self.last_report = now
+        elapsed = max(now - self.started, 1e-9)
+        print(
+            f"[{elapsed:8.1f}s] read {self.conversations} conversations "
+            f"({self.bytes_read / 1e6:.1f} MB, {self.messages} messages), "
+            f"wrote {self.written} ({self.failed} failed, {self.skipped} skipped) | "
+            f"{self.written / elapsed:.1f} conv/s, {self.messages / elapsed:.0f} msg/s, "
+            f"{self.bytes_read / 1e6 / elapsed:.2f} MB/s",
+            file=self.stream,
+            flush=True,
+        )
+
+
+def read_conversations(source: IO[bytes], progress: Progress) -> Iterator[Dict[str, Any]]:
+    for line_number, line in enumerate(source, start=1):
+        progress.bytes_read += len(line)
+        if not line.strip():
+            continue
+        try:
+            conversation = json.loads(line)
+            messages = conversation["messages"]
+            if not isinstance(messages, list):
+                raise TypeError(f"messages must be a list, not {type(messages).__name__}")
+            message_count = len(messages)
+        except (ValueError, KeyError, TypeError) as e:
+            progress.skipped += 1
+            print(f"line {line_number}: skipped ({e})", file=progress.stream, flush=True)
+            continue
+        progress.conversations += 1
+        progress.messages += message_count
+        yield conversation
+
+
+def run(source: IO[bytes], sink: IO[str], batch_extractor: BatchExtractor, progress: Progress) -> None:
+    for result in batch_extractor.extract_many(read_conversations(source, progress)):
+        sink.write(json.dumps(result) + "\n")
+        progress.written += 1
+        if not result["success"]:
+            progress.failed += 1
+        progress.tick()
+    sink.flush()
+    progress.tick(force=True)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Extract memories from a JSONL chat export (one {user_id, messages} object per line)."
+    )
+    parser.add_argument("input", help="input JSONL file, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="output JSONL file, or - for stdout")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="worker processes (default: CPU count, 0 = inline)")
+    parser.add_argument("--max-pending", type=int, default=None, help="conversations in flight at once")
+    parser.add_argument("--batch-size", type=int, default=256, help="spaCy nlp.pipe batch size per worker")
+    parser.add_argument("--progress-every", type=float, default=5.0, help="seconds between throughput reports")
+    args = parser.parse_args(argv)
+
+    batch_extractor = BatchExtractor(workers=args.workers, max_pending=args.max_pending, batch_size=args.batch_size)
+    progress = Progress(sys.stderr, args.progress_every)
+
+    source = sys.stdin.buffer if args.input == "-" else open(args.input, "rb", buffering=1 << 20)
+    sink = sys.stdout if args.output == "-" else open(args.output, "w", buffering=1 << 20)
+    try:
+        run(source, sink, batch_extractor, progress)
+    finally:
+        batch_extractor.close()
+        if source is not sys.stdin.buffer:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+
+    return 0 if progress.failed == 0 and progress.skipped == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
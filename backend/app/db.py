@@ -0,0 +1,37 @@
+import os
+import sqlite3
+import threading
+from typing import Callable, Optional
+
+
+class ProcessConnection:
+    # A SQLite connection opened on first use in each process. Connections
+    # must not cross fork(): under gunicorn's preload_app the stores are
+    # built in the master, and every worker then opens the file itself.
+
+    def __init__(self, path: str, setup: Optional[Callable[[sqlite3.Connection], None]] = None,
+                 timeout: float = 30.0):
+        self.path = path
+        self.setup = setup
+        self.timeout = timeout
+        self.guard = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    def get(self) -> sqlite3.Connection:
+        pid = os.getpid()
+        if self._pid != pid:
+            with self.guard:
+                if self._pid != pid:
+                    conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+                    if self.setup is not None:
+                        with conn:
+                            self.setup(conn)
+                    self._conn, self._pid = conn, pid
+        return self._conn
+
+    def close(self) -> None:
+        with self.guard:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn, self._pid = None, None
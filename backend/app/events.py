@@ -0,0 +1,200 @@
+import json
+import sqlite3
+import threading
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.app.db import ProcessConnection
+from backend.app.merge import IDENTITY
+
+
+# Item fields that make up each IDENTITY key, in key order.
+KEY_FIELDS = {
+    "preferences": ("category", "value"),
+    "emotional_patterns": ("pattern",),
+    "facts": ("fact_type", "value"),
+    "raw_extractions": ("entity_type", "text", "message_index"),
+}
+
+
+def diff_events(before: Optional[Dict[str, Any]], after: Dict[str, Any]) -> List[Dict[str, Any]]:
+    # Items in a merged memory are unique per identity, and merging keeps
+    # surviving items in place and appends new ones, so "added" events
+    # replayed in order reproduce the item order of `after`.
+    before = before or {}
+    events = []
+    for field, identity in IDENTITY.items():
+        old = {identity(item): item for item in before.get(field, [])}
+        new = {identity(item): item for item in after.get(field, [])}
+
+        for key, item in old.items():
+            if key not in new:
+                events.append({"type": "evicted", "field": field, "key": list(key)})
+
+        for key, item in new.items():
+            previous = old.get(key)
+            if previous is None:
+                events.append({"type": "added", "field": field, "item": item})
+            elif previous != item:
+                changes = {name: value for name, value in item.items() if previous.get(name) != value}
+                event_type = "confidence_changed" if "confidence" in changes else "updated"
+                events.append({"type": event_type, "field": field, "key": list(key), "changes": changes})
+
+    if events or after.get("generated_at") != before.get("generated_at"):
+        events.append({"type": "generated", "generated_at": after["generated_at"]})
+    return events
+
+
+def apply_events(memory: Optional[Dict[str, Any]], events: List[Dict[str, Any]], user_id: str) -> Dict[str, Any]:
+    memory = memory or {"user_id": user_id, "generated_at": None}
+    items: Dict[str, Dict[Tuple, Dict[str, Any]]] = {
+        field: {identity(item): item for item in memory.get(field, [])}
+        for field, identity in IDENTITY.items()
+    }
+
+    for event in events:
+        event_type = event["type"]
+        if event_type == "generated":
+            memory["generated_at"] = event["generated_at"]
+        elif event_type == "added":
+            item = event["item"]
+            items[event["field"]][IDENTITY[event["field"]](item)] = item
+        elif event_type == "evicted":
+            items[event["field"]].pop(tuple(event["key"]), None)
+        else:
+            field, key = event["field"], tuple(event["key"])
+            item = items[field].get(key)
+            if item is None:
+                # A change to an item the log never saw added (e.g. stored by
+                # a path that didn't record events): treat it as an add.
+                item = items[field][key] = dict(zip(KEY_FIELDS[field], key))
+            item.update(event["changes"])
+
+    rebuilt = {"user_id": memory["user_id"], "generated_at": memory["generated_at"]}
+    for field in IDENTITY:
+        rebuilt[field] = list(items[field].values())
+    return rebuilt
+
+
+class EventLog:
+
+    def __init__(self, path: str, snapshot_every: int = 500):
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            # Create the tables up front: record(conn=...) writes through
+            # MemoryStore's connection, which never runs our setup. The
+            # connection is closed again so none is held across fork().
+            with closing(sqlite3.connect(path, timeout=30.0)) as conn, conn:
+                self._create_tables(conn)
+        self.snapshot_every = snapshot_every
+        self.db = ProcessConnection(path, self._create_tables)
+        self.lock = threading.Lock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        return self.db.get()
+
+    @staticmethod
+    def _create_tables(conn: sqlite3.Connection) -> None:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS memory_events ("
+            "user_id TEXT NOT NULL, seq INTEGER NOT NULL, data TEXT NOT NULL, "
+            "PRIMARY KEY (user_id, seq))"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS memory_snapshots ("
+            "user_id TEXT NOT NULL, seq INTEGER NOT NULL, data TEXT NOT NULL, "
+            "PRIMARY KEY (user_id, seq))"
+        )
+
+    def record(self, user_id: str, before: Optional[Dict[str, Any]], after: Dict[str, Any],
+               conn: Optional[sqlite3.Connection] = None) -> int:
+        # Pass `conn` to append the events inside a caller's open BEGIN
+        # IMMEDIATE transaction on the same database file (MemoryStore's), so
+        # the store rows and their events commit together. Either way seq is
+        # read and written under SQLite's write lock, so workers can't race
+        # for the same seq.
+        events = diff_events(before, after)
+        if conn is not None:
+            return self._append(conn, user_id, events, after)
+
+        with self.lock:
+            conn = self.conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                count = self._append(conn, user_id, events, after)
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+            return count
+
+    def _append(self, conn: sqlite3.Connection, user_id: str, events: List[Dict[str, Any]],
+                after: Dict[str, Any]) -> int:
+        seq = self._last_seq(conn, user_id)
+        conn.executemany(
+            "INSERT INTO memory_events (user_id, seq, data) VALUES (?, ?, ?)",
+            [(user_id, seq + offset, json.dumps(event)) for offset, event in enumerate(events, start=1)],
+        )
+        seq += len(events)
+
+        snapshot_seq = self._snapshot_seq(conn, user_id)
+        if seq - snapshot_seq >= self.snapshot_every:
+            conn.execute(
+                "INSERT INTO memory_snapshots (user_id, seq, data) VALUES (?, ?, ?)",
+                (user_id, seq, json.dumps(after)),
+            )
+        return len(events)
+
+    def snapshot(self, user_id: str, memory: Dict[str, Any]) -> None:
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO memory_snapshots (user_id, seq, data) VALUES (?, ?, ?)",
+                (user_id, self._last_seq(self.conn, user_id), json.dumps(memory)),
+            )
+
+    def rebuild(self, user_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT seq, data FROM memory_snapshots WHERE user_id = ? ORDER BY seq DESC LIMIT 1", (user_id,)
+            ).fetchone()
+            snapshot_seq, memory = (row[0], json.loads(row[1])) if row else (0, None)
+            events = [
+                json.loads(data) for (data,) in self.conn.execute(
+                    "SELECT data FROM memory_events WHERE user_id = ? AND seq > ? ORDER BY seq",
+                    (user_id, snapshot_seq),
+                )
+            ]
+        if memory is None and not events:
+            return None
+        return apply_events(memory, events, user_id)
+
+    def prune(self, user_id: str) -> int:
+        with self.lock, self.conn:
+            snapshot_seq = self._snapshot_seq(self.conn, user_id)
+            cursor = self.conn.execute(
+                "DELETE FROM memory_events WHERE user_id = ? AND seq <= ?", (user_id, snapshot_seq)
+            )
+            self.conn.execute(
+                "DELETE FROM memory_snapshots WHERE user_id = ? AND seq < ?", (user_id, snapshot_seq)
+            )
+            return cursor.rowcount
+
+    def tail_length(self, user_id: str) -> int:
+        with self.lock:
+            return self._last_seq(self.conn, user_id) - self._snapshot_seq(self.conn, user_id)
+
+    def close(self) -> None:
+        with self.lock:
+            self.db.close()
+
+    def _last_seq(self, conn: sqlite3.Connection, user_id: str) -> int:
+        row = conn.execute("SELECT MAX(seq) FROM memory_events WHERE user_id = ?", (user_id,)).fetchone()
+        return max(row[0] or 0, self._snapshot_seq(conn, user_id))
+
+    @staticmethod
+    def _snapshot_seq(conn: sqlite3.Connection, user_id: str) -> int:
+        row = conn.execute("SELECT MAX(seq) FROM memory_snapshots WHERE user_id = ?", (user_id,)).fetchone()
+        return row[0] or 0
@@ -1,26 +1,52 @@
 import re
-from typing import List, Dict, Any
+import threading
+from typing import List, Dict, Any, Tuple
 from datetime import datetime
-import spacy
+
+from backend.app.cache import LRUCache, content_key
+from backend.app.matcher import MultiPatternMatcher, literal_prefixes
+
+
+NER_COMPONENTS = ("ner",)
+WARM_UP_TEXT = "I moved to Berlin last Monday and started working at Google."
+
+# Bounded gap between the two halves of a "this ... that" pattern. An
+# unbounded .* makes every failed attempt rescan to the end of the line,
+# which turns a long pasted message into quadratic work. This narrows what
+# matches: the halves must now be at most 80 characters apart, so "I hate
+# ... meetings" spread over a long sentence no longer counts.
+GAP = r".{0,80}"
+
+# Negation, hedging and past-tense cues that a keyword pattern cannot read:
+# "I'm not vegetarian anymore" still matches the vegetarian pattern.
+AMBIGUITY_CUES = re.compile(
+    r"\b(?:not|no longer|never|used to|anymore|maybe|might|sometimes|kind of|sort of)\b|n't\b",
+    re.IGNORECASE,
+)
 
 
 class Extractor:
     
-    def __init__(self):
-        self.nlp = spacy.load("en_core_web_sm")
+    def __init__(self, batch_size: int = 256, n_process: int = 1, cache_size: int = 10000):
+        self._nlp = None
+        self._ner_disabled: List[str] = []
+        self.load_lock = threading.Lock()
+        self.batch_size = batch_size
+        self.n_process = n_process
+        self.entity_cache = LRUCache(max_entries=cache_size)
         
         self.patterns = {
             "vegetarian": re.compile(r"\b(vegetarian|vegan|plant-based)\b", re.IGNORECASE),
             "lo-fi": re.compile(r"\b(lo-?fi|lofi)\b", re.IGNORECASE),
             "green tea": re.compile(r"\bgreen tea\b", re.IGNORECASE),
             "async": re.compile(r"\b(async|asynchronous)\b", re.IGNORECASE),
-            "hates meetings": re.compile(r"\b(hate|dislike|struggling with).*(meeting|standup)\b", re.IGNORECASE),
+            "hates meetings": re.compile(r"\b(hate|dislike|struggling with)" + GAP + r"(meeting|standup)\b", re.IGNORECASE),
             "linux": re.compile(r"\blinux\b", re.IGNORECASE),
             "allergic": re.compile(r"\ballergic to ([a-z]+)\b", re.IGNORECASE),
-            "short messages": re.compile(r"\b(brief|short|concise).*(message|communication)\b", re.IGNORECASE),
-            "works late": re.compile(r"\b(work|working).*(late|night)\b", re.IGNORECASE),
+            "short messages": re.compile(r"\b(brief|short|concise)" + GAP + r"(message|communication)\b", re.IGNORECASE),
+            "works late": re.compile(r"\b(work|working)" + GAP + r"(late|night)\b", re.IGNORECASE),
             "pet": re.compile(r"\b(cat|dog|pet)\b(?:\s+(\w+))?", re.IGNORECASE),
-            "prefer text": re.compile(r"\bprefer.*(text|async|writing)\b", re.IGNORECASE),
+            "prefer text": re.compile(r"\bprefer" + GAP + r"(text|async|writing)\b", re.IGNORECASE),
             "direct communication": re.compile(r"\bdirect\s+communication\b", re.IGNORECASE),
             "early bird": re.compile(r"\b(morning person|early bird|wake up early)\b", re.IGNORECASE),
             "introvert": re.compile(r"\b(introvert|introverted|prefer alone time)\b", re.IGNORECASE),
@@ -41,26 +67,109 @@ class Extractor:
             "happy": re.compile(r"\b(happy|joyful|delighted)\b", re.IGNORECASE),
             "confused": re.compile(r"\b(confused|unsure|uncertain)\b", re.IGNORECASE),
         }
+        
+        # Literal prefixes one of which must start any match of the pattern,
+        # derived from the regexes so the two can't drift apart.
+        self.pattern_triggers = {name: literal_prefixes(pattern) for name, pattern in self.patterns.items()}
+        self.emotion_triggers = {name: literal_prefixes(pattern) for name, pattern in self.emotional_keywords.items()}
+        
+        self.matcher = MultiPatternMatcher(
+            [(("preference", name), pattern, self.pattern_triggers[name])
+             for name, pattern in self.patterns.items()]
+            + [(("emotion", name), pattern, self.emotion_triggers[name])
+               for name, pattern in self.emotional_keywords.items()]
+        )
+    
+    @property
+    def nlp(self):
+        if self._nlp is None:
+            with self.load_lock:
+                if self._nlp is None:
+                    import spacy
+                    nlp = spacy.load("en_core_web_sm")
+                    self._ner_disabled = self._unused_components(nlp)
+                    self._nlp = nlp
+        return self._nlp
+    
+    @property
+    def ner_disabled(self) -> List[str]:
+        self.nlp
+        return self._ner_disabled
+    
+    def is_ready(self) -> bool:
+        return self._nlp is not None
+    
+    def warm_up(self) -> None:
+        for _ in self.nlp.pipe([WARM_UP_TEXT], disable=self.ner_disabled):
+            pass
+    
+    def extract(self, messages: List[Dict[str, Any]], user_id: str = "default_user") -> Dict[str, Any]:
+        state = self.new_state(user_id)
+        self._extract_into(messages, state)
+        return state["memory"]
+    
+    def extract_incremental(self, messages: List[Dict[str, Any]], state: Dict[str, Any]) -> Dict[str, Any]:
+        new_messages = [msg for msg in messages if msg["index"] > state["last_index"]]
+        if new_messages:
+            self._extract_into(new_messages, state)
+            state["last_index"] = max(msg["index"] for msg in new_messages)
+        return state["memory"]
+    
+    def triage(self, messages: List[Dict[str, Any]]) -> Dict[int, str]:
+        # Classifies each user message by how well the deterministic rules
+        # cover it: "resolved" (pattern or entity hits), "ambiguous" (hits in
+        # a question or next to a negation/hedge) or "unresolved" (no hits).
+        user_messages = [msg for msg in messages if msg.get("role") == "user"]
+        entities = self.extract_entities([msg["content"] for msg in user_messages])
+        
+        status = {}
+        for msg, message_entities in zip(user_messages, entities):
+            content = msg["content"]
+            if not message_entities and not self.matcher.scan(content):
+                status[msg["index"]] = "unresolved"
+            elif content.rstrip().endswith("?") or AMBIGUITY_CUES.search(content):
+                status[msg["index"]] = "ambiguous"
+            else:
+                status[msg["index"]] = "resolved"
+        return status
+    
+    def new_state(self, user_id: str = "default_user") -> Dict[str, Any]:
+        return {
+            "last_index": -1,
+            "seen_preferences": set(),
+            "seen_emotions": set(),
+            "seen_facts": set(),
+            "memory": {
+                "user_id": user_id,
+                "generated_at": datetime.utcnow().isoformat() + "Z",
+                "preferences": [],
+                "emotional_patterns": [],
+                "facts": [],
+                "raw_extractions": []
+            }
+        }
     
-    def extract(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
-        preferences = []
-        emotional_patterns = []
-        facts = []
-        raw_extractions = []
+    def _extract_into(self, messages: List[Dict[str, Any]], state: Dict[str, Any]) -> None:
+        memory = state["memory"]
+        preferences = memory["preferences"]
+        emotional_patterns = memory["emotional_patterns"]
+        facts = memory["facts"]
+        raw_extractions = memory["raw_extractions"]
         
-        seen_preferences = set()
-        seen_emotions = set()
-        seen_facts = set()
+        seen_preferences = state["seen_preferences"]
+        seen_emotions = state["seen_emotions"]
+        seen_facts = state["seen_facts"]
         
-        for msg in messages:
-            if msg.get("role") != "user":
-                continue
-                
+        user_messages = [msg for msg in messages if msg.get("role") == "user"]
+        entities = self.extract_entities([msg["content"] for msg in user_messages])
+        
+        for msg, message_entities in zip(user_messages, entities):
             idx = msg["index"]
             content = msg["content"]
+            hits = self.matcher.scan(content)
             
-            for pref_name, pattern in self.patterns.items():
-                match = pattern.search(content)
+            for pref_name in self.patterns:
+                match = hits.get(("preference", pref_name))
                 if match:
                     pref_key = f"{pref_name}:{match.group(0).lower()}"
                     if pref_key not in seen_preferences:
@@ -95,8 +204,8 @@ class Extractor:
                                 "source_messages": [idx]
                             })
             
-            for emotion, pattern in self.emotional_keywords.items():
-                if pattern.search(content):
+            for emotion in self.emotional_keywords:
+                if ("emotion", emotion) in hits:
                     if emotion not in seen_emotions:
                         seen_emotions.add(emotion)
                         emotional_patterns.append({
@@ -105,36 +214,63 @@ class Extractor:
                             "source_messages": [idx]
                         })
             
-            doc = self.nlp(content)
-            for ent in doc.ents:
-                fact_key = f"{ent.label_}:{ent.text.lower()}"
+            for label, text in message_entities:
+                fact_key = f"{label}:{text.lower()}"
                 if fact_key not in seen_facts:
                     seen_facts.add(fact_key)
                     
-                    fact_type = self._map_entity_to_fact_type(ent.label_)
+                    fact_type = self._map_entity_to_fact_type(label)
                     facts.append({
                         "fact_type": fact_type,
-                        "value": ent.text,
+                        "value": text,
                         "confidence": 0.88,
                         "source_messages": [idx]
                     })
                     
                     raw_extractions.append({
-                        "text": ent.text,
+                        "text": text,
                         "message_index": idx,
-                        "entity_type": ent.label_
+                        "entity_type": label
                     })
         
-        memory = {
-            "user_id": "default_user",
-            "generated_at": datetime.utcnow().isoformat() + "Z",
-            "preferences": preferences,
-            "emotional_patterns": emotional_patterns,
-            "facts": facts,
-            "raw_extractions": raw_extractions
-        }
+        memory["generated_at"] = datetime.utcnow().isoformat() + "Z"
+    
+    def extract_entities(self, texts: List[str]) -> List[Tuple[Tuple[str, str], ...]]:
+        keys = [content_key(text) for text in texts]
+        results = {}
+        pending = {}
+        
+        for key, text in zip(keys, texts):
+            if key in results or key in pending:
+                continue
+            cached = self.entity_cache.get(key)
+            if cached is None:
+                pending[key] = text
+            else:
+                results[key] = cached
+        
+        if pending:
+            docs = self.nlp.pipe(
+                pending.values(),
+                batch_size=self.batch_size,
+                n_process=self.n_process,
+                disable=self.ner_disabled,
+            )
+            for key, doc in zip(pending, docs):
+                spans = tuple((ent.label_, ent.text) for ent in doc.ents)
+                self.entity_cache.put(key, spans)
+                results[key] = spans
         
-        return memory
+        return [results[key] for key in keys]
+    
+    @staticmethod
+    def _unused_components(nlp) -> List[str]:
+        needed = set(NER_COMPONENTS)
+        for name in NER_COMPONENTS:
+            for source_name, source in nlp.pipeline:
+                if name in getattr(source, "listening_components", []):
+                    needed.add(source_name)
+        return [name for name in nlp.pipe_names if name not in needed]
     
     def _categorize_preference(self, pref_name: str) -> str:
         category_map = {
@@ -0,0 +1,70 @@
+import re
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+from backend.app.matcher import trie_regex
+
+
+# Topics in priority order: when a message mentions several, the first one
+# listed wins. Keywords match case-insensitively. A keyword ending in "*" is
+# a stem that matches any word starting with it ("learn*" covers "learned",
+# "learning"); the rest match whole words only, which keeps short,
+# collision-prone words like "cat" and "rest" out of "category" and
+# "restaurant". When stems overlap, the longest one decides the topic, so
+# "workout" is exercise and "workload" is work. Keywords only match at the
+# start of a word, so compounds like "homework" need their own entry; any
+# compound not listed here does not route.
+TOPICS: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("stress", ("stress*", "distress*", "overwhelm*", "anxious*", "anxiety", "anxieties", "pressur*")),
+    ("work", ("work*", "cowork*", "overwork*", "homework*", "teamwork*", "housework*", "paperwork*",
+              "project*", "deadline*", "job*")),
+    ("learn", ("learn*", "study", "studies", "studied", "studying", "course*", "skill*")),
+    ("food", ("food*", "eat", "eats", "eating", "eaten", "eater", "eaters", "ate", "cook*", "dinner*", "meal*")),
+    ("communication", ("meeting*", "call*", "communicat*", "talk*")),
+    ("pet", ("pet", "pets", "cat", "cats", "dog", "dogs", "animal*")),
+    ("weekend", ("weekend*", "activit*", "free time*", "hobby*", "hobbies")),
+    ("exercise", ("exercis*", "fitness", "gym*", "workout*")),
+    ("sleep", ("sleep*", "tired*", "rest", "rests", "rested", "resting", "restful", "restless")),
+    ("social", ("friend*", "social*", "people")),
+    ("decision", ("decision*", "choice*", "should i")),
+)
+
+
+class IntentRouter:
+
+    def __init__(self, topics: Iterable[Tuple[str, Sequence[str]]] = TOPICS):
+        self.topics = []
+        self.priority: Dict[str, int] = {}
+        stems, words = [], []
+        for topic, keywords in topics:
+            self.topics.append(topic)
+            for keyword in keywords:
+                keyword = keyword.lower()
+                if keyword.endswith("*"):
+                    keyword = keyword[:-1]
+                    stems.append(keyword)
+                else:
+                    words.append(keyword)
+                self.priority.setdefault(keyword, len(self.topics) - 1)
+
+        # One capturing group per kind, so hit.lastindex says which keyword
+        # matched: the stem a word starts with, or an exact keyword.
+        # Matching a lowercased message case-sensitively is about twice as fast
+        # as re.IGNORECASE on the same text.
+        alternatives = []
+        if stems:
+            alternatives.append("(" + trie_regex(stems) + r")\w*")
+        if words:
+            alternatives.append("(" + trie_regex(words) + r")\b")
+        self.scanner = re.compile(r"\b(?:" + "|".join(alternatives) + ")") if alternatives else None
+
+    def classify(self, message: str) -> Optional[str]:
+        if self.scanner is None:
+            return None
+        best = None
+        for hit in self.scanner.finditer(message.lower()):
+            priority = self.priority[hit.group(hit.lastindex)]
+            if best is None or priority < best:
+                best = priority
+                if best == 0:
+                    break
+        return None if best is None else self.topics[best]
@@ -1,39 +1,392 @@
+import asyncio
+import importlib.util
+import json
 import os
-from typing import Optional, List, Dict, Any
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, List, Optional
 from dotenv import load_dotenv
 
+from backend.app.cache import DiskCache, content_key
+from backend.app.merge import MemoryMerger
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
 load_dotenv()
 
 
+@lru_cache(maxsize=None)
+def _encoding():
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model("gpt-3.5-turbo")
+    except Exception:
+        return None
+
+
+def estimate_tokens(text: str) -> int:
+    encoding = _encoding()
+    if encoding is None:
+        # Roughly four characters per token for English text.
+        return len(text) // 4 + 1
+    return len(encoding.encode(text))
+
+
+def message_line(msg: Dict[str, Any]) -> str:
+    return f"[{msg['index']}] {msg['role']}: {msg['content']}"
+
+
+def chunk_messages(messages: List[Dict[str, Any]], max_tokens: int) -> List[List[Dict[str, Any]]]:
+    # Windows of consecutive user messages whose prompt lines fit in
+    # max_tokens. A message longer than the budget gets a window of its own.
+    chunks: List[List[Dict[str, Any]]] = []
+    current: List[Dict[str, Any]] = []
+    used = 0
+    for msg in messages:
+        if msg.get('role') != 'user':
+            continue
+        cost = estimate_tokens(message_line(msg))
+        if current and used + cost > max_tokens:
+            chunks.append(current)
+            current, used = [], 0
+        current.append(msg)
+        used += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+PERSONALITY_PROMPTS = {
+    "calm_mentor": "Rewrite this in a calm, thoughtful, mentor-like tone. Be gentle and encouraging.",
+    "witty_friend": "Rewrite this in a casual, witty, friendly tone. Add some humor and emojis.",
+    "therapist": "Rewrite this in a validating, empathetic therapist tone. Add reflective questions."
+}
+
+
 class NoLLMAvailable(Exception):
     pass
 
 
+class RewriteCoalescer:
+    # Collects the async rewrites that arrive within `max_wait` seconds of
+    # each other, up to `max_batch` distinct texts per personality, and
+    # hands each group to `send` as one call. Callers asking for the same
+    # text in the same window share one result.
+    
+    def __init__(self, send, max_batch: int, max_wait: float):
+        self.send = send
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._loop = None
+        self._pending: Dict[str, Dict[str, List[asyncio.Future]]] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._tasks = set()
+    
+    async def rewrite(self, text: str, personality: str) -> str:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._pending, self._timers = loop, {}, {}
+        
+        future = loop.create_future()
+        group = self._pending.setdefault(personality, {})
+        group.setdefault(text, []).append(future)
+        if len(group) >= self.max_batch:
+            self._flush(personality)
+        elif personality not in self._timers:
+            self._timers[personality] = loop.call_later(self.max_wait, self._flush, personality)
+        return await future
+    
+    def _flush(self, personality: str) -> None:
+        timer = self._timers.pop(personality, None)
+        if timer is not None:
+            timer.cancel()
+        group = self._pending.pop(personality, None)
+        if group:
+            task = self._loop.create_task(self._deliver(group, personality))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+    
+    async def _deliver(self, group: Dict[str, List[asyncio.Future]], personality: str) -> None:
+        texts = list(group)
+        try:
+            results = await self.send(texts, personality)
+        except Exception as e:
+            results = [e] * len(texts)
+        except BaseException:
+            for futures in group.values():
+                for future in futures:
+                    future.cancel()
+            raise
+        for text, result in zip(texts, results):
+            for future in group[text]:
+                if future.done():
+                    continue
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+
 class LLMClient:
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 max_connections: Optional[int] = None, cache: Optional[DiskCache] = None,
+                 chunk_tokens: Optional[int] = None, parallelism: Optional[int] = None,
+                 batch_size: Optional[int] = None, batch_wait: Optional[float] = None):
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
-        self.client = None
+        self.base_url = base_url or os.getenv("OPENAI_BASE_URL")
+        self.max_connections = max_connections or int(os.getenv("LLM_MAX_CONNECTIONS", 100))
+        self.cache = cache
+        self.chunk_tokens = chunk_tokens or int(os.getenv("LLM_CHUNK_TOKENS", 2000))
+        self.parallelism = parallelism or int(os.getenv("LLM_PARALLELISM", 4))
+        self.merger = MemoryMerger()
+        self.batch_size = batch_size if batch_size is not None else int(os.getenv("LLM_BATCH_SIZE", 8))
+        self.batch_wait = batch_wait if batch_wait is not None else float(os.getenv("LLM_BATCH_WAIT_MS", 5)) / 1000
+        self.coalescer = None
+        if self.batch_size > 1:
+            self.coalescer = RewriteCoalescer(self._arewrite_many, self.batch_size, self.batch_wait)
+        self.enabled = False
+        self._client = None
+        self._async_client = None
+        self._async_loop = None
+        self.load_lock = threading.Lock()
         
         if self.api_key and self.api_key != "your-openai-api-key-here":
+            # Only check that the SDK is importable; importing it is deferred
+            # to the first call so workers can start serving straight away.
+            try:
+                spec = importlib.util.find_spec("openai")
+            except (ImportError, ValueError):
+                spec = None
+            if spec is None:
+                raise NoLLMAvailable("openai package not installed")
+            self.enabled = True
+    
+    @property
+    def client(self):
+        if self._client is None and self.enabled:
+            with self.load_lock:
+                if self._client is None:
+                    try:
+                        from openai import OpenAI
+                        self._client = OpenAI(api_key=self.api_key, base_url=self.base_url)
+                    except ImportError:
+                        raise NoLLMAvailable("openai package not installed")
+                    except Exception as e:
+                        raise NoLLMAvailable(f"Failed to initialize OpenAI client: {e}")
+        return self._client
+    
+    @property
+    def async_client(self):
+        # One AsyncOpenAI client, and so one keep-alive connection pool, per
+        # event loop: pooled connections cannot be shared between loops.
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            if not self.enabled:
+                return None
             try:
-                from openai import OpenAI
-                self.client = OpenAI(api_key=self.api_key)
+                import httpx
+                from openai import AsyncOpenAI, DefaultAsyncHttpxClient
             except ImportError:
                 raise NoLLMAvailable("openai package not installed")
-            except Exception as e:
-                raise NoLLMAvailable(f"Failed to initialize OpenAI client: {e}")
+            limits = httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections
+            )
+            self._async_client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                http_client=DefaultAsyncHttpxClient(limits=limits)
+            )
+            self._async_loop = loop
+        return self._async_client
     
     def is_available(self) -> bool:
-        return self.client is not None
+        return self.enabled
+    
+    def is_ready(self) -> bool:
+        return self._client is not None
+    
+    def warm_up(self) -> None:
+        if self.enabled:
+            self.client
+    
+    def extract_memories(self, messages: List[Dict[str, Any]], user_id: str = "default_user") -> Dict[str, Any]:
+        if not self.is_available():
+            raise NoLLMAvailable("LLM not available for extraction")
+        
+        chunks = chunk_messages(messages, self.chunk_tokens)
+        if len(chunks) <= 1:
+            chunks = [messages]
+        requests = [self._extraction_request(chunk) for chunk in chunks]
+        try:
+            if len(requests) == 1:
+                return self._parse_extraction(self._complete(requests[0]), user_id)
+            with ThreadPoolExecutor(max_workers=self.parallelism) as pool:
+                results = list(pool.map(self._complete, requests))
+            return self._merge_chunks([self._parse_extraction(result, user_id) for result in results])
+        except Exception as e:
+            raise NoLLMAvailable(f"LLM extraction failed: {e}")
     
-    def extract_memories(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    async def aextract_memories(self, messages: List[Dict[str, Any]], user_id: str = "default_user") -> Dict[str, Any]:
         if not self.is_available():
             raise NoLLMAvailable("LLM not available for extraction")
         
+        chunks = chunk_messages(messages, self.chunk_tokens)
+        if len(chunks) <= 1:
+            chunks = [messages]
+        requests = [self._extraction_request(chunk) for chunk in chunks]
+        semaphore = asyncio.Semaphore(self.parallelism)
+        
+        async def extract_chunk(request: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                return self._parse_extraction(await self._acomplete(request), user_id)
+        
+        try:
+            if len(requests) == 1:
+                return await extract_chunk(requests[0])
+            return self._merge_chunks(await asyncio.gather(*[extract_chunk(request) for request in requests]))
+        except Exception as e:
+            raise NoLLMAvailable(f"LLM extraction failed: {e}")
+    
+    def rewrite_with_personality(self, text: str, personality: str) -> str:
+        if not self.is_available():
+            raise NoLLMAvailable("LLM not available for rewriting")
+        
+        request = self._rewrite_request(text, personality)
+        try:
+            return self._complete(request).strip()
+        except Exception as e:
+            raise NoLLMAvailable(f"LLM rewrite failed: {e}")
+    
+    async def arewrite_with_personality(self, text: str, personality: str) -> str:
+        if not self.is_available():
+            raise NoLLMAvailable("LLM not available for rewriting")
+        
+        request = self._rewrite_request(text, personality)
+        if self.coalescer is not None:
+            cached = await self._acache_get(self._cache_key(request))
+            if cached is not None:
+                return cached.strip()
+            return await self.coalescer.rewrite(text, personality)
+        return await self._arewrite_one(request)
+    
+    async def astream_rewrite(self, text: str, personality: str) -> AsyncIterator[str]:
+        # Yields the rewrite as the completion streams in. A cached rewrite
+        # arrives as a single piece; a finished stream is cached whole.
+        if not self.is_available():
+            raise NoLLMAvailable("LLM not available for rewriting")
+        
+        request = self._rewrite_request(text, personality)
+        key = self._cache_key(request)
+        cached = await self._acache_get(key)
+        if cached is not None:
+            yield cached.strip()
+            return
+        
+        parts = []
+        stream = None
+        try:
+            stream = await self.async_client.chat.completions.create(**request, stream=True)
+            async for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        except Exception as e:
+            raise NoLLMAvailable(f"LLM rewrite stream failed: {e}")
+        finally:
+            # Also runs when the caller stops early, returning the connection to the pool.
+            if stream is not None:
+                await stream.close()
+        if parts:
+            await self._acache_put(key, "".join(parts))
+    
+    async def _arewrite_one(self, request: Dict[str, Any]) -> str:
+        try:
+            return (await self._acomplete(request)).strip()
+        except Exception as e:
+            raise NoLLMAvailable(f"LLM rewrite failed: {e}")
+    
+    async def _arewrite_many(self, texts: List[str], personality: str) -> List[Any]:
+        # One JSON-mode request for the whole group. The reply is cached under
+        # the batch request: a rewrite made alongside other texts comes from a
+        # different prompt than a single-text one, so the two never share an
+        # entry. A malformed reply falls back to one request per text and is
+        # not cached.
+        requests = [self._rewrite_request(text, personality) for text in texts]
+        if len(texts) == 1:
+            return await asyncio.gather(self._arewrite_one(requests[0]), return_exceptions=True)
+        
+        batch_request = self._batch_rewrite_request(texts, personality)
+        key = self._cache_key(batch_request)
+        try:
+            content = await self._acache_get(key)
+            cached = content is not None
+            if not cached:
+                response = await self.async_client.chat.completions.create(**batch_request)
+                content = response.choices[0].message.content
+            rewrites = json.loads(content)["rewrites"]
+            if len(rewrites) != len(texts) or not all(isinstance(rewrite, str) for rewrite in rewrites):
+                raise ValueError("batched rewrite does not match the texts sent")
+        except Exception:
+            return await asyncio.gather(*[self._arewrite_one(request) for request in requests], return_exceptions=True)
+        
+        if not cached:
+            await self._acache_put(key, content)
+        return [rewrite.strip() for rewrite in rewrites]
+    
+    def _complete(self, request: Dict[str, Any]) -> str:
+        key = self._cache_key(request)
+        cached = self.cache.get(key) if self.cache is not None else None
+        if cached is not None:
+            return cached
+        
+        response = self.client.chat.completions.create(**request)
+        content = response.choices[0].message.content
+        if self.cache is not None and content is not None:
+            self.cache.put(key, content)
+        return content
+    
+    async def _acomplete(self, request: Dict[str, Any]) -> str:
+        key = self._cache_key(request)
+        cached = await self._acache_get(key)
+        if cached is not None:
+            return cached
+        
+        response = await self.async_client.chat.completions.create(**request)
+        content = response.choices[0].message.content
+        if content is not None:
+            await self._acache_put(key, content)
+        return content
+    
+    # The cache is a SQLite file; its reads and writes go to a thread so
+    # they don't stall the event loop.
+    async def _acache_get(self, key: bytes) -> Optional[str]:
+        if self.cache is None:
+            return None
+        return await asyncio.to_thread(self.cache.get, key)
+    
+    async def _acache_put(self, key: bytes, value: str) -> None:
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.put, key, value)
+    
+    @staticmethod
+    def _cache_key(request: Dict[str, Any]) -> bytes:
+        # The whole request: model, system and user prompt, temperature, and
+        # every other parameter that changes the completion.
+        return content_key(json.dumps(request, sort_keys=True))
+    
+    @staticmethod
+    def _extraction_request(messages: List[Dict[str, Any]]) -> Dict[str, Any]:
         messages_text = "\n".join([
-            f"[{msg['index']}] {msg['role']}: {msg['content']}"
-            for msg in messages if msg.get('role') == 'user'
+            message_line(msg) for msg in messages if msg.get('role') == 'user'
         ])
         
         prompt = f"""Analyze the following user messages and extract structured information.
@@ -53,61 +406,73 @@ Return a JSON object with:
 
 Be specific and include message indices in source_messages."""
 
-        try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a memory extraction assistant. Always return valid JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                response_format={"type": "json_object"}
-            )
-            
-            import json
-            result = json.loads(response.choices[0].message.content)
-            
-            result["user_id"] = "default_user"
-            from datetime import datetime
-            result["generated_at"] = datetime.utcnow().isoformat() + "Z"
-            result["raw_extractions"] = []
-            
-            return result
-            
-        except Exception as e:
-            raise NoLLMAvailable(f"LLM extraction failed: {e}")
+        return {
+            "model": "gpt-3.5-turbo",
+            "messages": [
+                {"role": "system", "content": "You are a memory extraction assistant. Always return valid JSON."},
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": 0.3,
+            "response_format": {"type": "json_object"}
+        }
     
-    def rewrite_with_personality(self, text: str, personality: str) -> str:
-        if not self.is_available():
-            raise NoLLMAvailable("LLM not available for rewriting")
+    @staticmethod
+    def _parse_extraction(content: str, user_id: str) -> Dict[str, Any]:
+        result = json.loads(content)
         
-        personality_prompts = {
-            "calm_mentor": "Rewrite this in a calm, thoughtful, mentor-like tone. Be gentle and encouraging.",
-            "witty_friend": "Rewrite this in a casual, witty, friendly tone. Add some humor and emojis.",
-            "therapist": "Rewrite this in a validating, empathetic therapist tone. Add reflective questions."
-        }
+        result["user_id"] = user_id
+        result["generated_at"] = datetime.utcnow().isoformat() + "Z"
+        result["raw_extractions"] = []
         
-        if personality not in personality_prompts:
+        return result
+    
+    def _merge_chunks(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        # Items found in several windows collapse into one, with their
+        # source_messages combined.
+        memory = None
+        for result in results:
+            memory = self.merger.merge(memory, result)
+        return memory
+    
+    @staticmethod
+    def _rewrite_request(text: str, personality: str) -> Dict[str, Any]:
+        if personality not in PERSONALITY_PROMPTS:
             raise ValueError(f"Unknown personality: {personality}")
         
-        prompt = personality_prompts[personality]
-        
-        try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": prompt},
-                    {"role": "user", "content": f"Rewrite this: {text}"}
-                ],
-                temperature=0.7,
-                max_tokens=200
-            )
-            
-            return response.choices[0].message.content.strip()
-            
-        except Exception as e:
-            raise NoLLMAvailable(f"LLM rewrite failed: {e}")
+        return {
+            "model": "gpt-3.5-turbo",
+            "messages": [
+                {"role": "system", "content": PERSONALITY_PROMPTS[personality]},
+                {"role": "user", "content": f"Rewrite this: {text}"}
+            ],
+            "temperature": 0.7,
+            "max_tokens": 200
+        }
+    
+    @staticmethod
+    def _batch_rewrite_request(texts: List[str], personality: str) -> Dict[str, Any]:
+        instructions = (
+            f"{PERSONALITY_PROMPTS[personality]} You will receive a JSON object whose \"texts\" list holds "
+            "separate texts. Rewrite each one on its own and reply with a JSON object "
+            "{\"rewrites\": [...]} holding exactly one rewritten string per text, in the same order."
+        )
+        return {
+            "model": "gpt-3.5-turbo",
+            "messages": [
+                {"role": "system", "content": instructions},
+                {"role": "user", "content": json.dumps({"texts": texts})}
+            ],
+            "temperature": 0.7,
+            "max_tokens": 200 * len(texts),
+            "response_format": {"type": "json_object"}
+        }
     
     def close(self):
-        if self.client:
-            self.client = None
\ No newline at end of file
+        self.enabled = False
+        self._client = None
+    
+    async def aclose(self):
+        client, self._async_client, self._async_loop = self._async_client, None, None
+        self.close()
+        if client is not None:
+            await client.close()
@@ -0,0 +1,117 @@
+import re
+from typing import Dict, Hashable, Iterable, List, Optional, Pattern, Sequence, Tuple
+
+try:
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_constants
+    import sre_parse
+
+
+class MultiPatternMatcher:
+
+    def __init__(self, rules: Iterable[Tuple[Hashable, Pattern, Sequence[str]]]):
+        self.rules: List[Tuple[Hashable, Pattern]] = []
+        self.untriggered: List[int] = []
+        by_trigger: Dict[str, List[int]] = {}
+
+        for position, (key, pattern, triggers) in enumerate(rules):
+            self.rules.append((key, pattern))
+            if not triggers:
+                self.untriggered.append(position)
+            for trigger in triggers:
+                by_trigger.setdefault(trigger.lower(), []).append(position)
+
+        # A hit on the longest trigger at a word start implies every shorter
+        # trigger that is a prefix of it, so fold those rules in up front.
+        self.candidates: Dict[str, Tuple[int, ...]] = {}
+        for trigger in by_trigger:
+            positions = set()
+            for other, other_positions in by_trigger.items():
+                if trigger.startswith(other):
+                    positions.update(other_positions)
+            self.candidates[trigger] = tuple(sorted(positions))
+
+        self.everything = tuple(range(len(self.rules)))
+        self.scanner = self._compile_trie(by_trigger) if by_trigger else None
+
+    def scan(self, text: str) -> Dict[Hashable, "re.Match"]:
+        found: Dict[int, "re.Match"] = {}
+
+        if self.scanner is not None:
+            for hit in self.scanner.finditer(text):
+                start = hit.start()
+                for position in self.candidates.get(hit.group(0).lower(), self.everything):
+                    if position in found:
+                        continue
+                    match = self.rules[position][1].match(text, start)
+                    if match:
+                        found[position] = match
+
+        for position in self.untriggered:
+            match = self.rules[position][1].search(text)
+            if match:
+                found[position] = match
+
+        return {self.rules[position][0]: found[position] for position in sorted(found)}
+
+    @staticmethod
+    def _compile_trie(triggers: Iterable[str]) -> Pattern:
+        return re.compile(r"(?<!\w)" + trie_regex(triggers), re.IGNORECASE)
+
+
+def literal_prefixes(pattern: Pattern) -> List[str]:
+    # Triggers for MultiPatternMatcher read off the regex itself: the literal
+    # text every match must start with, one prefix per alternative. Only
+    # patterns anchored at a word start qualify, since the trigger scan only
+    # looks at word starts; anything else gets no triggers and is searched
+    # on every message.
+    items = list(sre_parse.parse(pattern.pattern, pattern.flags))
+    if not items or items[0] != (sre_constants.AT, sre_constants.AT_BOUNDARY):
+        return []
+    prefixes = _literal_prefixes(items[1:])
+    if not all(re.match(r"\w", prefix) for prefix in prefixes):
+        return []
+    return sorted({prefix.lower() for prefix in prefixes})
+
+
+def _literal_prefixes(items: list) -> List[str]:
+    prefix = ""
+    for op, av in items:
+        if op is sre_constants.LITERAL:
+            prefix += chr(av)
+            continue
+        if op is sre_constants.SUBPATTERN:
+            alternatives = [av[-1]]
+        elif op is sre_constants.BRANCH:
+            alternatives = av[1]
+        else:
+            break
+        return [prefix + tail for alternative in alternatives for tail in _literal_prefixes(list(alternative))]
+    return [prefix]
+
+
+def trie_regex(words: Iterable[str]) -> str:
+    # Alternation of `words` factored into a character trie, so the regex
+    # engine never retries a shared prefix once per word.
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    return _trie_node_regex(trie) or ""
+
+
+def _trie_node_regex(node: Dict[str, dict]) -> Optional[str]:
+    terminal = "" in node
+    branches = [
+        re.escape(char) + (_trie_node_regex(child) or "")
+        for char, child in sorted(node.items()) if char
+    ]
+    if not branches:
+        return None
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if terminal:
+        return "(?:" + body + ")?"
+    return body
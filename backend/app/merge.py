@@ -0,0 +1,76 @@
+import copy
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+IDENTITY: Dict[str, Callable[[Dict[str, Any]], Tuple]] = {
+    "preferences": lambda item: (item.get("category"), str(item.get("value", "")).lower()),
+    "emotional_patterns": lambda item: (item.get("pattern"),),
+    "facts": lambda item: (item.get("fact_type"), str(item.get("value", "")).lower()),
+    "raw_extractions": lambda item: (item.get("entity_type"), str(item.get("text", "")).lower(), item.get("message_index")),
+}
+
+DEFAULT_LIMITS = {
+    "preferences": 200,
+    "emotional_patterns": 50,
+    "facts": 500,
+    "raw_extractions": 1000,
+}
+
+
+class MemoryMerger:
+
+    def __init__(self, limits: Optional[Dict[str, int]] = None, max_sources: int = 50):
+        self.limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self.max_sources = max_sources
+
+    def merge(self, base: Optional[Dict[str, Any]], update: Dict[str, Any]) -> Dict[str, Any]:
+        base = base or {}
+        merged = {
+            "user_id": update.get("user_id", base.get("user_id", "default_user")),
+            "generated_at": datetime.utcnow().isoformat() + "Z",
+        }
+        for field, identity in IDENTITY.items():
+            items = self._merge_items(base.get(field, []) + update.get(field, []), identity)
+            merged[field] = self._evict(items, self.limits[field])
+        return merged
+
+    def compact(self, memory: Dict[str, Any]) -> Dict[str, Any]:
+        return self.merge(None, memory)
+
+    def _merge_items(self, items: List[Dict[str, Any]], identity: Callable) -> List[Dict[str, Any]]:
+        by_identity: Dict[Tuple, Dict[str, Any]] = {}
+        for item in items:
+            key = identity(item)
+            existing = by_identity.get(key)
+            if existing is None:
+                by_identity[key] = copy.deepcopy(item)
+                continue
+
+            if "source_messages" in existing:
+                known = set(existing["source_messages"])
+                new_sources = [idx for idx in item.get("source_messages", []) if idx not in known]
+                if "confidence" in existing:
+                    if new_sources:
+                        # Independent evidence: noisy-OR of the two confidences.
+                        existing["confidence"] = round(
+                            1 - (1 - existing["confidence"]) * (1 - item.get("confidence", 0)), 4
+                        )
+                    else:
+                        existing["confidence"] = max(existing["confidence"], item.get("confidence", 0))
+                sources = sorted(known.union(new_sources))
+                existing["source_messages"] = sources[-self.max_sources:]
+        return list(by_identity.values())
+
+    @staticmethod
+    def _evict(items: List[Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
+        if len(items) <= limit:
+            return items
+
+        def score(position: int) -> Tuple:
+            item = items[position]
+            sources = item.get("source_messages") or [item.get("message_index", -1)]
+            return item.get("confidence", 0), max(sources), position
+
+        keep = set(sorted(range(len(items)), key=score, reverse=True)[:limit])
+        return [item for position, item in enumerate(items) if position in keep]
@@ -1,103 +1,281 @@
 import re
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from typing import Dict, Any, Hashable, List, Optional
 import random
 
+from backend.app.cache import LRUCache
+from backend.app.intents import IntentRouter
+
+
+MEMORY_FIELDS = ("preferences", "emotional_patterns", "facts")
+NEGATIVE_EMOTIONS = ("stress", "anxious", "overwhelmed", "frustrated", "overthinking", "tired")
+WORK_CATEGORIES = ("work_style", "communication")
+PET_WORDS = re.compile("cat|dog|pet|luna")
+SOCIAL_WORDS = re.compile("introvert|extrovert")
+
+RESPONSES: Dict[str, List[str]] = {
+    "stress": [
+        "Break things down into smaller, manageable steps. Focus on what you can control right now, and let go of what you can't. Taking short breaks throughout your day can help reset your nervous system.",
+        "When feeling overwhelmed, pause and take three deep breaths. Write down everything on your mind, then prioritize just the top three items. You don't have to tackle everything at once.",
+        "Stress often comes from trying to control too much. Identify what's truly urgent versus what can wait. Give yourself permission to not be perfect - progress matters more than perfection."
+    ],
+    "work": [
+        "Structure your work around your natural energy peaks. Block out focused time for deep work, and use lower-energy periods for meetings or admin tasks. Protect your productive hours fiercely.",
+        "Set clear boundaries between work and personal time. Your brain needs recovery periods to perform at its best. Consider time-blocking your calendar to create structure without rigidity.",
+        "Quality work comes from sustainable routines, not constant hustle. Build in buffer time for unexpected issues, and communicate realistic timelines. It's better to under-promise and over-deliver."
+    ],
+    "learn": [
+        "Choose one skill and commit to 30 days of consistent practice. Even 20 minutes daily builds momentum. Focus on application, not just consumption - build projects while you learn.",
+        "Start with the fundamentals and resist jumping ahead. Master the basics through repetition, then layer on complexity. Learning is a marathon, not a sprint.",
+        "Find a learning style that matches your strengths. Some people learn by doing, others by teaching. Experiment with different methods until you find what clicks for you."
+    ],
+    "food": [
+        "Plan your meals at the start of the week to reduce daily decision fatigue. Batch cook basics like grains and proteins that you can mix and match. Keep it simple - nutrition doesn't have to be complicated.",
+        "Listen to your body's hunger cues rather than eating by the clock. Choose whole foods that make you feel energized, not sluggish. Meal prep can be as simple as chopping vegetables in advance.",
+        "Build meals around foods you genuinely enjoy - sustainable eating isn't about restriction. Having go-to simple recipes removes the stress of daily cooking decisions."
+    ],
+    "communication": [
+        "Set clear agendas before meetings and stick to them. If it can be an email, make it an email. Your time and focus are valuable resources - protect them accordingly.",
+        "Communicate your preferred working style upfront to set expectations. Async communication often leads to more thoughtful responses. Don't feel guilty about declining meetings that don't need you.",
+        "Block out 'no meeting' time on your calendar for focused work. When meetings are necessary, keep them short and action-oriented. End each meeting with clear next steps and owners."
+    ],
+    "pet": [
+        "Create a routine for pet care that fits naturally into your day. Pets thrive on consistency, and so do we. Set specific times for play, feeding, and attention so it doesn't feel overwhelming.",
+        "Your pet can actually help reduce stress when you build in intentional interaction time. Short play sessions throughout the day can be refreshing breaks that benefit both of you.",
+        "Balance is key - your pet needs attention, but you also need focused work time. Create a dedicated space where your pet knows it's quiet time, using positive reinforcement to build the habit."
+    ],
+    "weekend": [
+        "Mix energizing activities with restorative ones. Don't overschedule your free time - leave room for spontaneity and rest. The best weekend is one where you feel refreshed, not exhausted.",
+        "Try the 'one thing' rule: plan one main activity and leave the rest flexible. This removes pressure while still giving your weekend structure. Sometimes doing nothing is exactly what you need.",
+        "Balance social activities with solo recharge time based on what energizes you. Your weekend should refuel you for the week ahead, not drain you further."
+    ],
+    "exercise": [
+        "Start with movement you actually enjoy - fitness shouldn't feel like punishment. Consistency beats intensity. Even 15 minutes daily creates lasting habits better than sporadic intense sessions.",
+        "Build exercise into your existing routine rather than adding it as a separate task. Walk during calls, stretch between work sessions, or bike to errands. Make it convenient and it'll stick.",
+        "Focus on how exercise makes you feel rather than how you look. Track energy levels and mood improvements alongside physical metrics. The mental health benefits often show up before physical changes."
+    ],
+    "sleep": [
+        "Protect your sleep like you'd protect an important meeting. Set a consistent bedtime routine and stick to it, even on weekends. Your phone should charge in another room - your bedroom is for sleep, not scrolling.",
+        "Quality sleep is non-negotiable for cognitive performance and emotional regulation. Dim lights an hour before bed, keep your room cool, and avoid caffeine after 2pm. You can't optimize your way out of sleep deprivation.",
+        "If you're consistently tired, examine your sleep environment and pre-bed habits. Most sleep issues come from inconsistent schedules and stimulating activities too close to bedtime. Your body craves routine."
+    ],
+    "social": [
+        "Quality relationships require intentional effort but shouldn't feel draining. Protect energy for people who reciprocate care and respect your boundaries. It's okay to let some relationships naturally fade.",
+        "Schedule regular check-ins with people who matter, even if brief. Deep friendships aren't built on grand gestures but consistent small connections. A quick message can maintain bonds between bigger hangouts.",
+        "Know your social capacity and honor it without guilt. Saying no to some invitations means you can fully show up for the ones you accept. Authentic connection beats surface-level networking every time."
+    ],
+    "decision": [
+        "Big decisions rarely need to be made instantly. Sleep on it, but set a deadline to avoid analysis paralysis. List pros and cons, then trust your gut - your intuition processes information your conscious mind hasn't caught up to yet.",
+        "Consider your decision through three lenses: what makes logical sense, what feels right emotionally, and what aligns with your long-term values. When all three align, you have your answer.",
+        "Most decisions are reversible or adjustable. The cost of a wrong decision is often less than the cost of no decision. Make the best choice with current information, then commit and course-correct if needed."
+    ],
+    "general": [
+        "Start by clarifying what success looks like for this situation. Break it into smaller questions you can answer more easily. Often, the right path reveals itself when you zoom in on specifics.",
+        "There's rarely one perfect answer. Consider what aligns with your values and current life season. What works for others might not work for you, and that's completely fine.",
+        "Take a step back and ask yourself what advice you'd give a friend in this situation. We're often clearer about others' situations than our own. That outside perspective can be revealing.",
+        "Instead of looking for the 'right' answer, look for the next right step. Forward motion creates clarity that thinking in circles never will. Action beats perfect planning."
+    ]
+}
+
+
+class MemoryIndex:
+    # Lookups generate_memory_aware_response needs from a memory. Each list is
+    # indexed in a single pass the first time a response needs it, so a cached
+    # index answers later messages without rescanning the memory.
+
+    def __init__(self, memory: Dict[str, Any]):
+        self.memory = memory
+        self._preferences: Optional[Dict[str, List[Any]]] = None
+        self._facts: Optional[Dict[str, List[Any]]] = None
+        self._emotions: Optional[set] = None
+        self.tags: Dict[str, List[Any]] = {}
+
+    def preferences(self, category: str) -> List[Any]:
+        if self._preferences is None:
+            self._index_preferences()
+        return self._preferences.get(category, [])
+
+    def facts(self, fact_type: str) -> List[Any]:
+        if self._facts is None:
+            self._index_facts()
+        return self._facts.get(fact_type, [])
+
+    def tagged(self, tag: str) -> List[Any]:
+        if tag not in self.tags:
+            if tag in ("work", "social"):
+                self._index_preferences()
+            else:
+                self._index_facts()
+        return self.tags[tag]
+
+    def has_emotion(self, emotions) -> bool:
+        if self._emotions is None:
+            self._emotions = {
+                pattern.get("pattern", "") if isinstance(pattern, dict) else str(pattern)
+                for pattern in self.memory.get("emotional_patterns") or []
+            }
+        return any(emotion in self._emotions for emotion in emotions)
+
+    def _index_preferences(self) -> None:
+        by_category: Dict[str, List[Any]] = {}
+        work, social = [], []
+        for pref in self.memory.get("preferences") or []:
+            if not isinstance(pref, dict):
+                continue
+            value = pref.get("value", "")
+            category = pref.get("category", "")
+            if category in by_category:
+                by_category[category].append(value)
+            else:
+                by_category[category] = [value]
+            if category in WORK_CATEGORIES:
+                work.append(value)
+            if isinstance(value, str) and SOCIAL_WORDS.search(value):
+                social.append(value)
+        self._preferences = by_category
+        self.tags.update(work=work, social=social)
+
+    def _index_facts(self) -> None:
+        by_type: Dict[str, List[Any]] = {}
+        allergy, pet = [], []
+        for fact in self.memory.get("facts") or []:
+            if not isinstance(fact, dict):
+                continue
+            value = fact.get("value", "")
+            fact_type = fact.get("fact_type", "")
+            if fact_type in by_type:
+                by_type[fact_type].append(value)
+            else:
+                by_type[fact_type] = [value]
+            if isinstance(value, str):
+                value_lower = value.lower()
+                if "allerg" in value_lower:
+                    allergy.append(value)
+                if PET_WORDS.search(value_lower):
+                    pet.append(value)
+        self._facts = by_type
+        self.tags.update(allergy=allergy, pet=pet, location=by_type.get("location", []))
+
 
 class RewriteStrategy(ABC):
     
     @abstractmethod
-    def rewrite(self, neutral_text: str) -> str:
+    def rewrite(self, neutral_text: str, rng: Optional[random.Random] = None) -> str:
         pass
 
 
 class CalmMentorStrategy(RewriteStrategy):
     
-    def rewrite(self, neutral_text: str) -> str:
-        templates = [
-            "Let me share a perspective with you. {}",
-            "I've been thinking about this. {}",
-            "Here's what I've observed: {}",
-            "Consider this approach: {}",
-            "From my experience, {}",
-            "Let's think through this together. {}"
-        ]
-        
-        endings = [
-            " Take your time with this decision.",
-            " Trust the process - you're on the right path.",
-            " Small steps lead to meaningful progress.",
-            " Be patient with yourself as you navigate this.",
-            " Every challenge teaches us something valuable.",
-            " You have the wisdom within you to figure this out."
-        ]
-        
-        template = random.choice(templates)
-        ending = random.choice(endings)
+    # Templates are split around their "{}" once, so a rewrite is plain
+    # concatenation instead of str.format.
+    templates = tuple(tuple(template.split("{}", 1)) for template in (
+        "Let me share a perspective with you. {}",
+        "I've been thinking about this. {}",
+        "Here's what I've observed: {}",
+        "Consider this approach: {}",
+        "From my experience, {}",
+        "Let's think through this together. {}"
+    ))
+    
+    endings = (
+        " Take your time with this decision.",
+        " Trust the process - you're on the right path.",
+        " Small steps lead to meaningful progress.",
+        " Be patient with yourself as you navigate this.",
+        " Every challenge teaches us something valuable.",
+        " You have the wisdom within you to figure this out."
+    )
+    
+    def rewrite(self, neutral_text: str, rng: Optional[random.Random] = None) -> str:
+        choice = (rng or random).choice
+        prefix, suffix = choice(self.templates)
+        ending = choice(self.endings)
         
-        return template.format(neutral_text) + ending
+        return prefix + neutral_text + suffix + ending
 
 
 class WittyFriendStrategy(RewriteStrategy):
     
-    def rewrite(self, neutral_text: str) -> str:
-        intros = [
-            "Yo, listen up! ",
-            "Alright, real talk - ",
-            "Here's the deal: ",
-            "Okay so check it out - ",
-            "Not gonna lie, ",
-            "Here's my two cents: "
-        ]
-        
-        endings = [
-            " 🎯 You got this!",
-            " 💪 Trust me on this one!",
-            " 😄 But hey, that's just me!",
-            " ✨ Make it happen!",
-            " 🚀 Go crush it!",
-            " 💡 Pretty solid advice if you ask me!"
-        ]
-        
-        intro = random.choice(intros)
-        ending = random.choice(endings)
+    intros = (
+        "Yo, listen up! ",
+        "Alright, real talk - ",
+        "Here's the deal: ",
+        "Okay so check it out - ",
+        "Not gonna lie, ",
+        "Here's my two cents: "
+    )
+    
+    endings = (
+        " 🎯 You got this!",
+        " 💪 Trust me on this one!",
+        " 😄 But hey, that's just me!",
+        " ✨ Make it happen!",
+        " 🚀 Go crush it!",
+        " 💡 Pretty solid advice if you ask me!"
+    )
+    
+    # No replacement contains another phrase, so applying them in sequence
+    # equals one left-to-right pass. str.replace is C-level and measured
+    # faster than a combined regex with a callback, even on long texts.
+    substitutions = (
+        ("you should", "you could totally"),
+        ("it is important", "it's super important"),
+        ("consider", "think about")
+    )
+    
+    def rewrite(self, neutral_text: str, rng: Optional[random.Random] = None) -> str:
+        choice = (rng or random).choice
+        intro = choice(self.intros)
+        ending = choice(self.endings)
         
-        casual_text = neutral_text.replace("you should", "you could totally")
-        casual_text = casual_text.replace("it is important", "it's super important")
-        casual_text = casual_text.replace("consider", "think about")
+        casual_text = neutral_text
+        for phrase, replacement in self.substitutions:
+            casual_text = casual_text.replace(phrase, replacement)
         
         return intro + casual_text + ending
 
 
 class TherapistStrategy(RewriteStrategy):
     
-    def rewrite(self, neutral_text: str) -> str:
-        validations = [
-            "I really hear what you're saying. ",
-            "Your feelings about this are completely valid. ",
-            "Thank you for sharing this with me. ",
-            "I appreciate you opening up about this. ",
-            "It sounds like you're navigating something important. ",
-            "What you're experiencing makes complete sense. "
-        ]
-        
-        questions = [
-            " How does this feel for you right now?",
-            " What emotions come up when you think about this?",
-            " How are you taking care of yourself through this?",
-            " What would feel most supportive to you?",
-            " How can you honor what you need in this moment?",
-            " What does your inner voice tell you about this?"
-        ]
-        
-        validation = random.choice(validations)
-        question = random.choice(questions)
+    validations = (
+        "I really hear what you're saying. ",
+        "Your feelings about this are completely valid. ",
+        "Thank you for sharing this with me. ",
+        "I appreciate you opening up about this. ",
+        "It sounds like you're navigating something important. ",
+        "What you're experiencing makes complete sense. "
+    )
+    
+    questions = (
+        " How does this feel for you right now?",
+        " What emotions come up when you think about this?",
+        " How are you taking care of yourself through this?",
+        " What would feel most supportive to you?",
+        " How can you honor what you need in this moment?",
+        " What does your inner voice tell you about this?"
+    )
+    
+    def rewrite(self, neutral_text: str, rng: Optional[random.Random] = None) -> str:
+        choice = (rng or random).choice
+        validation = choice(self.validations)
+        question = choice(self.questions)
         
         return validation + neutral_text + question
 
 
+# Strategies hold no per-call state, so one instance of each is shared.
+STRATEGIES: Dict[str, RewriteStrategy] = {
+    "calm_mentor": CalmMentorStrategy(),
+    "witty_friend": WittyFriendStrategy(),
+    "therapist": TherapistStrategy()
+}
+
+
 class PersonalityEngine:
-    def __init__(self):
+    def __init__(self, index_cache_size: int = 1024):
+        self.index_cache = LRUCache(index_cache_size)
+        self.router = IntentRouter()
+        self.strategies = STRATEGIES
         self.personalities = {
             "calm_mentor": {
                 "tone": "wise, patient, encouraging",
@@ -123,216 +301,86 @@ class PersonalityEngine:
             }
         }
     
-    def generate_memory_aware_response(self, memory: Dict[str, Any], user_message: str) -> str:
-        preferences = memory.get("preferences", [])
-        emotional_patterns = memory.get("emotional_patterns", [])
-        facts = memory.get("facts", [])
-        
-        message_lower = user_message.lower()
-        
-        context_parts = []
-        base_response = ""
-        
-        if "stress" in message_lower or "overwhelm" in message_lower or "anxious" in message_lower or "pressure" in message_lower:
-            responses = [
-                "Break things down into smaller, manageable steps. Focus on what you can control right now, and let go of what you can't. Taking short breaks throughout your day can help reset your nervous system.",
-                "When feeling overwhelmed, pause and take three deep breaths. Write down everything on your mind, then prioritize just the top three items. You don't have to tackle everything at once.",
-                "Stress often comes from trying to control too much. Identify what's truly urgent versus what can wait. Give yourself permission to not be perfect - progress matters more than perfection."
-            ]
-            
-            if emotional_patterns:
-                negative_emotions = ["stress", "anxious", "overwhelmed", "frustrated", "overthinking", "tired"]
-                patterns = [p.get("pattern", "") if isinstance(p, dict) else str(p) for p in emotional_patterns]
-                
-                if any(emotion in patterns for emotion in negative_emotions):
-                    context_parts.append("I've noticed you've been carrying a lot lately")
-            
-            base_response = random.choice(responses)
-        
-        elif "work" in message_lower or "project" in message_lower or "deadline" in message_lower or "job" in message_lower:
-            responses = [
-                "Structure your work around your natural energy peaks. Block out focused time for deep work, and use lower-energy periods for meetings or admin tasks. Protect your productive hours fiercely.",
-                "Set clear boundaries between work and personal time. Your brain needs recovery periods to perform at its best. Consider time-blocking your calendar to create structure without rigidity.",
-                "Quality work comes from sustainable routines, not constant hustle. Build in buffer time for unexpected issues, and communicate realistic timelines. It's better to under-promise and over-deliver."
-            ]
-            
-            if preferences:
-                work_prefs = []
-                for pref in preferences:
-                    if isinstance(pref, dict):
-                        value = pref.get("value", "")
-                        category = pref.get("category", "")
-                        if category in ["work_style", "communication"]:
-                            work_prefs.append(value)
-                
-                if work_prefs:
-                    context_parts.append(f"Given that you {', '.join(work_prefs[:2])}")
-            
-            base_response = random.choice(responses)
-        
-        elif "learn" in message_lower or "study" in message_lower or "course" in message_lower or "skill" in message_lower:
-            responses = [
-                "Choose one skill and commit to 30 days of consistent practice. Even 20 minutes daily builds momentum. Focus on application, not just consumption - build projects while you learn.",
-                "Start with the fundamentals and resist jumping ahead. Master the basics through repetition, then layer on complexity. Learning is a marathon, not a sprint.",
-                "Find a learning style that matches your strengths. Some people learn by doing, others by teaching. Experiment with different methods until you find what clicks for you."
-            ]
-            base_response = random.choice(responses)
-        
-        elif "food" in message_lower or "eat" in message_lower or "cook" in message_lower or "dinner" in message_lower or "meal" in message_lower:
-            responses = [
-                "Plan your meals at the start of the week to reduce daily decision fatigue. Batch cook basics like grains and proteins that you can mix and match. Keep it simple - nutrition doesn't have to be complicated.",
-                "Listen to your body's hunger cues rather than eating by the clock. Choose whole foods that make you feel energized, not sluggish. Meal prep can be as simple as chopping vegetables in advance.",
-                "Build meals around foods you genuinely enjoy - sustainable eating isn't about restriction. Having go-to simple recipes removes the stress of daily cooking decisions."
-            ]
-            
-            if preferences:
-                food_prefs = []
-                for pref in preferences:
-                    if isinstance(pref, dict):
-                        value = pref.get("value", "")
-                        category = pref.get("category", "")
-                        if category == "food":
-                            food_prefs.append(value)
-                
-                if food_prefs:
-                    context_parts.append(f"Since you're {', '.join(food_prefs)}")
-            
-            if facts:
-                allergies = []
-                for fact in facts:
-                    if isinstance(fact, dict):
-                        value = fact.get("value", "")
-                        if "allerg" in value.lower():
-                            allergies.append(value)
-                
-                if allergies:
-                    context_parts.append(f"and need to avoid {', '.join(allergies)}")
-            
-            base_response = random.choice(responses)
-        
-        elif "meeting" in message_lower or "call" in message_lower or "communicate" in message_lower or "talk" in message_lower:
-            responses = [
-                "Set clear agendas before meetings and stick to them. If it can be an email, make it an email. Your time and focus are valuable resources - protect them accordingly.",
-                "Communicate your preferred working style upfront to set expectations. Async communication often leads to more thoughtful responses. Don't feel guilty about declining meetings that don't need you.",
-                "Block out 'no meeting' time on your calendar for focused work. When meetings are necessary, keep them short and action-oriented. End each meeting with clear next steps and owners."
-            ]
-            
-            if preferences:
-                comm_prefs = []
-                for pref in preferences:
-                    if isinstance(pref, dict):
-                        value = pref.get("value", "")
-                        category = pref.get("category", "")
-                        if category == "communication":
-                            comm_prefs.append(value)
-                
-                if comm_prefs:
-                    context_parts.append(f"I know you work best with {', '.join(comm_prefs)}")
-            
-            base_response = random.choice(responses)
-        
-        elif "pet" in message_lower or "cat" in message_lower or "dog" in message_lower or "animal" in message_lower:
-            responses = [
-                "Create a routine for pet care that fits naturally into your day. Pets thrive on consistency, and so do we. Set specific times for play, feeding, and attention so it doesn't feel overwhelming.",
-                "Your pet can actually help reduce stress when you build in intentional interaction time. Short play sessions throughout the day can be refreshing breaks that benefit both of you.",
-                "Balance is key - your pet needs attention, but you also need focused work time. Create a dedicated space where your pet knows it's quiet time, using positive reinforcement to build the habit."
-            ]
-            
-            if facts:
-                pets = []
-                for fact in facts:
-                    if isinstance(fact, dict):
-                        value = fact.get("value", "")
-                        if any(word in value.lower() for word in ["cat", "dog", "pet", "luna"]):
-                            pets.append(value)
-                
-                if pets:
-                    context_parts.append(f"With {pets[0]}")
-            
-            base_response = random.choice(responses)
-        
-        elif "weekend" in message_lower or "activity" in message_lower or "free time" in message_lower or "hobby" in message_lower:
-            responses = [
-                "Mix energizing activities with restorative ones. Don't overschedule your free time - leave room for spontaneity and rest. The best weekend is one where you feel refreshed, not exhausted.",
-                "Try the 'one thing' rule: plan one main activity and leave the rest flexible. This removes pressure while still giving your weekend structure. Sometimes doing nothing is exactly what you need.",
-                "Balance social activities with solo recharge time based on what energizes you. Your weekend should refuel you for the week ahead, not drain you further."
-            ]
-            
-            if facts:
-                for fact in facts:
-                    if isinstance(fact, dict):
-                        fact_type = fact.get("fact_type", "")
-                        value = fact.get("value", "")
-                        if fact_type == "location":
-                            context_parts.append(f"Being in {value}")
-                            break
-            
-            base_response = random.choice(responses)
-        
-        elif "exercise" in message_lower or "fitness" in message_lower or "gym" in message_lower or "workout" in message_lower:
-            responses = [
-                "Start with movement you actually enjoy - fitness shouldn't feel like punishment. Consistency beats intensity. Even 15 minutes daily creates lasting habits better than sporadic intense sessions.",
-                "Build exercise into your existing routine rather than adding it as a separate task. Walk during calls, stretch between work sessions, or bike to errands. Make it convenient and it'll stick.",
-                "Focus on how exercise makes you feel rather than how you look. Track energy levels and mood improvements alongside physical metrics. The mental health benefits often show up before physical changes."
-            ]
-            base_response = random.choice(responses)
-        
-        elif "sleep" in message_lower or "tired" in message_lower or "rest" in message_lower:
-            responses = [
-                "Protect your sleep like you'd protect an important meeting. Set a consistent bedtime routine and stick to it, even on weekends. Your phone should charge in another room - your bedroom is for sleep, not scrolling.",
-                "Quality sleep is non-negotiable for cognitive performance and emotional regulation. Dim lights an hour before bed, keep your room cool, and avoid caffeine after 2pm. You can't optimize your way out of sleep deprivation.",
-                "If you're consistently tired, examine your sleep environment and pre-bed habits. Most sleep issues come from inconsistent schedules and stimulating activities too close to bedtime. Your body craves routine."
-            ]
-            base_response = random.choice(responses)
-        
-        elif "friend" in message_lower or "social" in message_lower or "people" in message_lower:
-            responses = [
-                "Quality relationships require intentional effort but shouldn't feel draining. Protect energy for people who reciprocate care and respect your boundaries. It's okay to let some relationships naturally fade.",
-                "Schedule regular check-ins with people who matter, even if brief. Deep friendships aren't built on grand gestures but consistent small connections. A quick message can maintain bonds between bigger hangouts.",
-                "Know your social capacity and honor it without guilt. Saying no to some invitations means you can fully show up for the ones you accept. Authentic connection beats surface-level networking every time."
-            ]
-            
-            if preferences:
-                for pref in preferences:
-                    if isinstance(pref, dict):
-                        value = pref.get("value", "")
-                        if "introvert" in value or "extrovert" in value:
-                            context_parts.append(f"As someone who's {value}")
-                            break
-            
-            base_response = random.choice(responses)
-        
-        elif "decision" in message_lower or "choice" in message_lower or "should i" in message_lower:
-            responses = [
-                "Big decisions rarely need to be made instantly. Sleep on it, but set a deadline to avoid analysis paralysis. List pros and cons, then trust your gut - your intuition processes information your conscious mind hasn't caught up to yet.",
-                "Consider your decision through three lenses: what makes logical sense, what feels right emotionally, and what aligns with your long-term values. When all three align, you have your answer.",
-                "Most decisions are reversible or adjustable. The cost of a wrong decision is often less than the cost of no decision. Make the best choice with current information, then commit and course-correct if needed."
-            ]
-            base_response = random.choice(responses)
+    def memory_index(self, memory: Dict[str, Any], memory_key: Optional[Hashable] = None) -> MemoryIndex:
+        # memory_key must change whenever the memory does, e.g. user id plus
+        # generated_at of a stored memory. Hashing the memory itself costs more
+        # than indexing it, so memories without a key are indexed per call.
+        if memory_key is None:
+            return MemoryIndex(memory)
+        index = self.index_cache.get(memory_key)
+        if index is None:
+            index = MemoryIndex(memory)
+            self.index_cache.put(memory_key, index)
+        return index
+
+    def generate_memory_aware_response(self, memory: Dict[str, Any], user_message: str,
+                                       memory_key: Optional[Hashable] = None,
+                                       rng: Optional[random.Random] = None) -> str:
+        return self._respond(self.memory_index(memory, memory_key), user_message, rng)
+    
+    def generate_memory_aware_responses(self, memory: Dict[str, Any], user_messages: List[str],
+                                        memory_key: Optional[Hashable] = None) -> List[str]:
+        index = self.memory_index(memory, memory_key)
+        return [self._respond(index, user_message) for user_message in user_messages]
+    
+    def _respond(self, index: MemoryIndex, user_message: str, rng: Optional[random.Random] = None) -> str:
+        topic = self.router.classify(user_message) or "general"
         
-        else:
-            responses = [
-                "Start by clarifying what success looks like for this situation. Break it into smaller questions you can answer more easily. Often, the right path reveals itself when you zoom in on specifics.",
-                "There's rarely one perfect answer. Consider what aligns with your values and current life season. What works for others might not work for you, and that's completely fine.",
-                "Take a step back and ask yourself what advice you'd give a friend in this situation. We're often clearer about others' situations than our own. That outside perspective can be revealing.",
-                "Instead of looking for the 'right' answer, look for the next right step. Forward motion creates clarity that thinking in circles never will. Action beats perfect planning."
-            ]
-            base_response = random.choice(responses)
+        context_parts = self._memory_context(topic, index)
+        base_response = (rng or random).choice(RESPONSES[topic])
         
         if context_parts:
             return f"{', '.join(context_parts)}, {base_response[0].lower()}{base_response[1:]}"
         else:
             return base_response
     
-    def rewrite(self, text: str, personality: str) -> str:
+    @staticmethod
+    def _memory_context(topic: str, index: MemoryIndex) -> List[str]:
+        context_parts = []
+        if topic == "stress":
+            if index.has_emotion(NEGATIVE_EMOTIONS):
+                context_parts.append("I've noticed you've been carrying a lot lately")
+        elif topic == "work":
+            work_prefs = index.tagged("work")
+            if work_prefs:
+                context_parts.append(f"Given that you {', '.join(work_prefs[:2])}")
+        elif topic == "food":
+            food_prefs = index.preferences("food")
+            if food_prefs:
+                context_parts.append(f"Since you're {', '.join(food_prefs)}")
+            allergies = index.tagged("allergy")
+            if allergies:
+                context_parts.append(f"and need to avoid {', '.join(allergies)}")
+        elif topic == "communication":
+            comm_prefs = index.preferences("communication")
+            if comm_prefs:
+                context_parts.append(f"I know you work best with {', '.join(comm_prefs)}")
+        elif topic == "pet":
+            pets = index.tagged("pet")
+            if pets:
+                context_parts.append(f"With {pets[0]}")
+        elif topic == "weekend":
+            locations = index.tagged("location")
+            if locations:
+                context_parts.append(f"Being in {locations[0]}")
+        elif topic == "social":
+            social = index.tagged("social")
+            if social:
+                context_parts.append(f"As someone who's {social[0]}")
+        return context_parts
+    
+    def rewrite(self, text: str, personality: str, rng: Optional[random.Random] = None) -> str:
+        return self._strategy(personality).rewrite(text, rng)
+    
+    def rewrite_many(self, texts: List[str], personality: str, seed: Optional[int] = None) -> List[str]:
+        # Each text gets its own generator, so a seeded batch matches
+        # rewriting every text separately with that seed.
+        strategy = self._strategy(personality)
+        if seed is None:
+            return [strategy.rewrite(text) for text in texts]
+        return [strategy.rewrite(text, random.Random(seed)) for text in texts]
+    
+    def _strategy(self, personality: str) -> RewriteStrategy:
         if personality not in self.personalities:
             raise ValueError(f"Unknown personality: {personality}")
-        
-        if personality == "calm_mentor":
-            strategy = CalmMentorStrategy()
-        elif personality == "witty_friend":
-            strategy = WittyFriendStrategy()
-        else:
-            strategy = TherapistStrategy()
-        
-        return strategy.rewrite(text)
\ No newline at end of file
+        return self.strategies[personality]
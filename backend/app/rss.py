@@ -0,0 +1,68 @@
+import argparse
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+FIELDS = {
+    "Rss": "rss",
+    "Pss": "pss",
+    "Private_Clean": "private_clean",
+    "Private_Dirty": "private_dirty",
+    "Shared_Clean": "shared_clean",
+    "Shared_Dirty": "shared_dirty",
+}
+
+
+def process_memory(pid: int) -> Dict[str, int]:
+    usage = {name: 0 for name in FIELDS.values()}
+    with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in FIELDS:
+                usage[FIELDS[key]] = int(rest.split()[0]) * 1024
+    usage["uss"] = usage["private_clean"] + usage["private_dirty"]
+    return usage
+
+
+def child_pids(pid: int) -> List[int]:
+    children = []
+    for task in Path(f"/proc/{pid}/task").iterdir():
+        path = task / "children"
+        if path.exists():
+            children.extend(int(child) for child in path.read_text().split())
+    return sorted(set(children))
+
+
+def report(master_pid: int) -> List[Dict[str, int]]:
+    rows = [{"pid": master_pid, "role": "master", **process_memory(master_pid)}]
+    for pid in child_pids(master_pid):
+        rows.append({"pid": pid, "role": "worker", **process_memory(pid)})
+    return rows
+
+
+def format_report(rows: List[Dict[str, int]]) -> str:
+    lines = [f"{'pid':>8} {'role':<7} {'RSS MB':>9} {'PSS MB':>9} {'USS MB':>9}"]
+    for row in rows:
+        lines.append(
+            f"{row['pid']:>8} {row['role']:<7} {row['rss'] / 2**20:>9.1f} "
+            f"{row['pss'] / 2**20:>9.1f} {row['uss'] / 2**20:>9.1f}"
+        )
+    total_pss = sum(row["pss"] for row in rows)
+    total_rss = sum(row["rss"] for row in rows)
+    lines.append(f"total PSS {total_pss / 2**20:.1f} MB (summed RSS {total_rss / 2**20:.1f} MB)")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Per-process RSS/PSS/USS for a server master and its workers (Linux only)."
+    )
+    parser.add_argument("pid", type=int, help="gunicorn master pid (or any parent of the workers)")
+    args = parser.parse_args(argv)
+    print(format_report(report(args.pid)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
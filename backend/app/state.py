@@ -0,0 +1,77 @@
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+from backend.app.cache import content_key
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+SET_FIELDS = ("seen_preferences", "seen_emotions", "seen_facts")
+# Users hash onto a fixed pool of thread locks, so the pool stays bounded no
+# matter how many users a worker sees. Two users sharing a stripe only
+# serialize with each other.
+LOCK_STRIPES = 64
+
+
+class ExtractionStateStore:
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+
+    @contextmanager
+    def lock(self, user_id: str) -> Iterator[None]:
+        # The thread lock serializes requests within a worker; the flock on a
+        # per-user lock file serializes the worker processes.
+        with self.locks[hash(user_id) % len(self.locks)]:
+            if fcntl is None:
+                yield
+                return
+            with open(self._path(user_id).with_suffix(".lock"), "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def load(self, user_id: str) -> Optional[Dict[str, Any]]:
+        path = self._path(user_id)
+        if not path.exists():
+            return None
+
+        with open(path, "r") as f:
+            state = json.load(f)
+
+        for field in SET_FIELDS:
+            state[field] = set(state[field])
+        return state
+
+    def save(self, user_id: str, state: Dict[str, Any]) -> None:
+        serialized = dict(state)
+        for field in SET_FIELDS:
+            serialized[field] = sorted(state[field])
+
+        path = self._path(user_id)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=path.stem, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(serialized, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def delete(self, user_id: str) -> None:
+        self._path(user_id).unlink(missing_ok=True)
+
+    def _path(self, user_id: str) -> Path:
+        return self.directory / f"{content_key(user_id).hex()}.json"
@@ -0,0 +1,139 @@
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from backend.app.db import ProcessConnection
+
+
+# memory field -> (kind stored in the items table, item key that is indexed)
+FIELDS = {
+    "preferences": ("preference", "category"),
+    "emotional_patterns": ("emotion", "pattern"),
+    "facts": ("fact", "fact_type"),
+    "raw_extractions": ("raw", "entity_type"),
+}
+# Per-user transaction locks are striped over a fixed pool, so they don't
+# grow with the number of users a worker has seen.
+LOCK_STRIPES = 64
+
+
+class MemoryStore:
+
+    def __init__(self, path: str):
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.db = ProcessConnection(path, self._create_tables)
+        self.lock = threading.Lock()
+        self.user_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        return self.db.get()
+
+    @staticmethod
+    def _create_tables(conn: sqlite3.Connection) -> None:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS memories ("
+            "user_id TEXT PRIMARY KEY, generated_at TEXT NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS items ("
+            "user_id TEXT NOT NULL, kind TEXT NOT NULL, position INTEGER NOT NULL, "
+            "key TEXT, data TEXT NOT NULL, PRIMARY KEY (user_id, kind, position))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS items_by_key ON items (user_id, kind, key)")
+
+    @contextmanager
+    def transaction(self, user_id: str) -> Iterator[sqlite3.Connection]:
+        # Read-modify-write of one user's memory. BEGIN IMMEDIATE takes the
+        # database write lock up front, so the read already excludes writers
+        # in other worker processes; pass the yielded connection to load()
+        # and save().
+        with self.user_locks[hash(user_id) % len(self.user_locks)], self.lock:
+            conn = self.conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+
+    def save(self, memory: Dict[str, Any], conn: Optional[sqlite3.Connection] = None) -> None:
+        if conn is not None:
+            self._write(conn, memory)
+            return
+        with self.lock, self.conn:
+            self._write(self.conn, memory)
+
+    def load(self, user_id: str, fields: Optional[Iterable[str]] = None,
+             keys: Optional[Dict[str, Iterable[str]]] = None,
+             conn: Optional[sqlite3.Connection] = None) -> Optional[Dict[str, Any]]:
+        # fields limits which memory lists are read at all; keys narrows a
+        # list to items whose category / pattern / fact_type / entity_type
+        # is one of the given values, served by the items_by_key index.
+        if conn is not None:
+            return self._read(conn, user_id, fields, keys)
+        with self.lock:
+            return self._read(self.conn, user_id, fields, keys)
+
+    def delete(self, user_id: str) -> None:
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM items WHERE user_id = ?", (user_id,))
+            self.conn.execute("DELETE FROM memories WHERE user_id = ?", (user_id,))
+
+    def user_ids(self) -> List[str]:
+        with self.lock:
+            return [row[0] for row in self.conn.execute("SELECT user_id FROM memories ORDER BY user_id")]
+
+    def close(self) -> None:
+        with self.lock:
+            self.db.close()
+
+    @staticmethod
+    def _write(conn: sqlite3.Connection, memory: Dict[str, Any]) -> None:
+        user_id = memory["user_id"]
+        rows = []
+        for field, (kind, key_name) in FIELDS.items():
+            for position, item in enumerate(memory.get(field, [])):
+                rows.append((user_id, kind, position, item.get(key_name), json.dumps(item)))
+
+        conn.execute("DELETE FROM items WHERE user_id = ?", (user_id,))
+        conn.execute(
+            "INSERT OR REPLACE INTO memories (user_id, generated_at) VALUES (?, ?)",
+            (user_id, memory["generated_at"]),
+        )
+        conn.executemany(
+            "INSERT INTO items (user_id, kind, position, key, data) VALUES (?, ?, ?, ?, ?)", rows
+        )
+
+    def _read(self, conn: sqlite3.Connection, user_id: str, fields: Optional[Iterable[str]],
+              keys: Optional[Dict[str, Iterable[str]]]) -> Optional[Dict[str, Any]]:
+        fields = list(FIELDS) if fields is None else list(fields)
+        keys = keys or {}
+
+        row = conn.execute("SELECT generated_at FROM memories WHERE user_id = ?", (user_id,)).fetchone()
+        if row is None:
+            return None
+
+        memory: Dict[str, Any] = {"user_id": user_id, "generated_at": row[0]}
+        for field in FIELDS:
+            memory[field] = self._load_items(conn, user_id, field, keys.get(field)) if field in fields else []
+        return memory
+
+    @staticmethod
+    def _load_items(conn: sqlite3.Connection, user_id: str, field: str,
+                    keys: Optional[Iterable[str]]) -> List[Dict[str, Any]]:
+        kind = FIELDS[field][0]
+        query = "SELECT data FROM items WHERE user_id = ? AND kind = ?"
+        params: List[Any] = [user_id, kind]
+        if keys is not None:
+            keys = list(keys)
+            query += f" AND key IN ({', '.join('?' for _ in keys)})"
+            params.extend(keys)
+        query += " ORDER BY position"
+        return [json.loads(row[0]) for row in conn.execute(query, params)]
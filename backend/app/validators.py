@@ -1,24 +1,124 @@
+import copy
 import json
 import jsonschema
+from functools import lru_cache
 from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import fastjsonschema
+except ImportError:
+    fastjsonschema = None
+
+
+SCHEMA_PATH = Path(__file__).parent.parent.parent / "schema" / "memory_schema.json"
+ITEM_FIELDS = ("preferences", "emotional_patterns", "facts", "raw_extractions")
 
 
 class ValidationError(Exception):
-    pass
 
+    def __init__(self, message: str, path: Sequence[Any] = ()):
+        super().__init__(message)
+        self.path = tuple(path)
+
+
+@lru_cache(maxsize=None)
+def load_schema() -> dict:
+    if not SCHEMA_PATH.exists():
+        raise ValidationError(f"Schema file not found: {SCHEMA_PATH}")
+
+    with open(SCHEMA_PATH, "r") as f:
+        return json.load(f)
+
+
+Compiled = Tuple[jsonschema.protocols.Validator, Optional[Callable[[Any], Any]]]
+
+
+def compile_schema(schema: dict) -> Compiled:
+    validator_class = jsonschema.validators.validator_for(schema)
 
-def validate_memory(memory: dict) -> None:
-    schema_path = Path(__file__).parent.parent.parent / "schema" / "memory_schema.json"
-    
-    if not schema_path.exists():
-        raise ValidationError(f"Schema file not found: {schema_path}")
-    
-    with open(schema_path, "r") as f:
-        schema = json.load(f)
-    
     try:
-        jsonschema.validate(instance=memory, schema=schema)
-    except jsonschema.ValidationError as e:
-        raise ValidationError(f"Memory validation failed: {e.message}") from e
+        validator_class.check_schema(schema)
     except jsonschema.SchemaError as e:
-        raise ValidationError(f"Invalid schema: {e.message}") from e
\ No newline at end of file
+        raise ValidationError(f"Invalid schema: {e.message}") from e
+
+    # Generated code answers the common "is it valid?" case fast. Formats are
+    # off so it accepts exactly what jsonschema accepts; jsonschema stays the
+    # reference and produces the error report when the fast check fails.
+    fast = fastjsonschema.compile(schema, use_formats=False) if fastjsonschema else None
+    return validator_class(schema), fast
+
+
+@lru_cache(maxsize=None)
+def compiled_validators() -> Compiled:
+    return compile_schema(load_schema())
+
+
+@lru_cache(maxsize=None)
+def compiled_item_validators() -> Tuple[Compiled, Dict[str, Compiled]]:
+    schema = load_schema()
+    envelope = copy.deepcopy(schema)
+    items = {}
+    for field in ITEM_FIELDS:
+        items[field] = compile_schema({"$schema": schema.get("$schema"), **schema["properties"][field]["items"]})
+        del envelope["properties"][field]["items"]
+    return compile_schema(envelope), items
+
+
+def find_error(instance: Any, validator: jsonschema.protocols.Validator,
+               fast: Optional[Callable[[Any], Any]] = None, prefix: Sequence[Any] = ()) -> Optional[ValidationError]:
+    if fast is not None:
+        try:
+            fast(instance)
+            return None
+        except fastjsonschema.JsonSchemaException:
+            pass
+
+    error = jsonschema.exceptions.best_match(validator.iter_errors(instance))
+    if error is None:
+        return None
+
+    path = tuple(prefix) + tuple(error.absolute_path)
+    if path:
+        location = "/".join(str(part) for part in path)
+        return ValidationError(f"Memory validation failed at {location}: {error.message}", path)
+    return ValidationError(f"Memory validation failed: {error.message}")
+
+
+def validate_memory(memory: dict) -> None:
+    error = find_error(memory, *compiled_validators())
+    if error is not None:
+        raise error
+
+
+def validate_many(memories: Sequence[dict]) -> List[Optional[ValidationError]]:
+    validator, fast = compiled_validators()
+    return [find_error(memory, validator, fast) for memory in memories]
+
+
+def item_counts(memory: dict) -> Dict[str, int]:
+    return {
+        field: len(memory[field]) if isinstance(memory.get(field), list) else 0
+        for field in ITEM_FIELDS
+    }
+
+
+def appended_since(memory: dict, counts: Dict[str, int]) -> Dict[str, range]:
+    return {field: range(counts.get(field, 0), size) for field, size in item_counts(memory).items()}
+
+
+def validate_memory_changes(memory: dict, changed: Dict[str, Iterable[int]]) -> None:
+    # Equivalent to validate_memory when every item outside `changed` was
+    # already valid: the envelope covers everything but the array items.
+    envelope, items = compiled_item_validators()
+    error = find_error(memory, *envelope)
+    if error is not None:
+        raise error
+
+    for field, indices in changed.items():
+        validator, fast = items[field]
+        values = memory[field]
+        for index in indices:
+            error = find_error(values[index], validator, fast, prefix=(field, index))
+            if error is not None:
+                raise error
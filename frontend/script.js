@@ -82,6 +82,69 @@ function removeMessage(index) {
     renderMessages();
 }
 
+function methodBadgeHtml(method) {
+    return method === 'llm'
+        ? '<span class="method-badge method-llm">LLM</span>'
+        : '<span class="method-badge method-deterministic">Deterministic</span>';
+}
+
+function setMethodBadge(container, method) {
+    container.querySelector('.method-badge').outerHTML = methodBadgeHtml(method);
+}
+
+// POSTs `body` and calls onEvent(event, data) for each server-sent event as
+// it arrives. EventSource only supports GET, so the stream is read by hand.
+async function streamEvents(url, body, onEvent) {
+    const response = await fetch(url, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(body)
+    });
+
+    if (!response.ok) {
+        const errorData = await response.json().catch(() => ({}));
+        throw new Error(errorData.detail || `Request failed (${response.status})`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const block = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let event = 'message';
+            let data = '';
+            block.split('\n').forEach(line => {
+                if (line.startsWith('event: ')) event = line.slice(7);
+                else if (line.startsWith('data: ')) data += line.slice(6);
+            });
+            if (data) onEvent(event, JSON.parse(data));
+        }
+    }
+}
+
+// Appends "token" events to `output` as they arrive; "fallback" and "done"
+// replace it with the final text.
+function renderStreamEvent(container, output, event, data) {
+    if (event === 'token') {
+        output.textContent += data.text;
+    } else if (event === 'fallback') {
+        output.textContent = data.text;
+    } else if (event === 'done') {
+        output.textContent = data.text;
+        output.classList.remove('streaming');
+        setMethodBadge(container, data.method);
+    }
+}
+
 async function extractMemories() {
     if (messages.length === 0) {
         alert('Please add some messages first');
@@ -119,9 +182,7 @@ async function extractMemories() {
 function displayExtractionResult(memory, method) {
     const container = document.getElementById('extract-result');
 
-    const methodBadge = method === 'llm'
-        ? '<span class="method-badge method-llm">LLM</span>'
-        : '<span class="method-badge method-deterministic">Deterministic</span>';
+    const methodBadge = methodBadgeHtml(method);
 
     let html = `
         <div class="result-header">
@@ -248,20 +309,22 @@ async function rewriteText() {
     const useLLM = document.getElementById('rewrite-use-llm').checked;
 
     try {
-        const response = await fetch(`${API_BASE_URL}/rewrite`, {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({
-                text: text,
-                personality: currentRewritePersonality,
-                use_llm: useLLM
-            })
+        const container = document.getElementById('rewrite-result');
+        let output = null;
+
+        await streamEvents(`${API_BASE_URL}/rewrite/stream`, {
+            text: text,
+            personality: currentRewritePersonality,
+            use_llm: useLLM
+        }, (event, data) => {
+            if (event === 'meta') {
+                displayRewriteResult(data.original, '', data.personality, data.method);
+                output = container.querySelector('.streamed-text');
+                output.classList.add('streaming');
+            } else {
+                renderStreamEvent(container, output, event, data);
+            }
         });
-
-        if (!response.ok) throw new Error('Rewrite failed');
-
-        const data = await response.json();
-        displayRewriteResult(data.original, data.rewritten, data.personality, data.method);
     } catch (error) {
         alert('Rewrite failed: ' + error.message);
     }
@@ -270,9 +333,7 @@ async function rewriteText() {
 function displayRewriteResult(original, rewritten, personality, method) {
     const container = document.getElementById('rewrite-result');
 
-    const methodBadge = method === 'llm'
-        ? '<span class="method-badge method-llm">LLM</span>'
-        : '<span class="method-badge method-deterministic">Deterministic</span>';
+    const methodBadge = methodBadgeHtml(method);
 
     container.innerHTML = `
         <div class="result-header">
@@ -286,7 +347,7 @@ function displayRewriteResult(original, rewritten, personality, method) {
             </div>
             <div class="text-box">
                 <h4>Transformed</h4>
-                <p>${rewritten}</p>
+                <p class="streamed-text">${rewritten}</p>
             </div>
         </div>
     `;
@@ -313,24 +374,23 @@ async function generateResponse() {
     const useLLM = document.getElementById('response-use-llm').checked;
 
     try {
-        const response = await fetch(`${API_BASE_URL}/generate-response`, {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({
-                memory: extractedMemory,
-                user_message: userMessage,
-                personality: currentResponsePersonality,
-                use_llm: useLLM
-            })
+        const container = document.getElementById('response-result');
+        let output = null;
+
+        await streamEvents(`${API_BASE_URL}/generate-response/stream`, {
+            memory: extractedMemory,
+            user_message: userMessage,
+            personality: currentResponsePersonality,
+            use_llm: useLLM
+        }, (event, data) => {
+            if (event === 'meta') {
+                displayResponseResult(userMessage, data.base_response, '', data.personality, data.method);
+                output = container.querySelector('.streamed-text');
+                output.classList.add('streaming');
+            } else {
+                renderStreamEvent(container, output, event, data);
+            }
         });
-
-        if (!response.ok) {
-            const errorData = await response.json();
-            throw new Error(errorData.detail || 'Response generation failed');
-        }
-
-        const data = await response.json();
-        displayResponseResult(userMessage, data.base_response, data.personalized_response, data.personality, data.method);
     } catch (error) {
         console.error('Response generation error:', error);
         alert('Response generation failed: ' + error.message);
@@ -340,9 +400,7 @@ async function generateResponse() {
 function displayResponseResult(userMessage, baseResponse, personalizedResponse, personality, method) {
     const container = document.getElementById('response-result');
 
-    const methodBadge = method === 'llm'
-        ? '<span class="method-badge method-llm">LLM</span>'
-        : '<span class="method-badge method-deterministic">Deterministic</span>';
+    const methodBadge = methodBadgeHtml(method);
 
     container.innerHTML = `
         <div class="result-header">
@@ -360,7 +418,7 @@ function displayResponseResult(userMessage, baseResponse, personalizedResponse,
             </div>
             <div class="text-box">
                 <h4>After (Personalized)</h4>
-                <p>${personalizedResponse}</p>
+                <p class="streamed-text">${personalizedResponse}</p>
             </div>
         </div>
     `;
@@ -0,0 +1,28 @@
+import gc
+import multiprocessing
+import os
+
+# Pre-forking launch mode: gunicorn imports main.py once in the master,
+# the spaCy model is loaded there before any worker is forked, and the
+# workers share the model's pages copy-on-write.
+#
+#   gunicorn main:app -c gunicorn.conf.py
+#
+# See `python -m backend.app.rss` for per-worker memory numbers.
+
+bind = f"0.0.0.0:{os.getenv('PORT', 8000)}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = int(os.getenv("WORKER_TIMEOUT", 120))
+
+
+def when_ready(server):
+    import main
+
+    main.extractor.warm_up()
+    main.llm_client.warm_up()
+    # Move everything allocated so far out of the collector's reach, so GC
+    # passes in the workers don't touch (and un-share) the model's objects.
+    gc.freeze()
+    server.log.info("Extractor loaded in master; forking workers")
@@ -1,16 +1,30 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Optional
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
+from collections import Counter
+import asyncio
+import json
 import logging
 from pathlib import Path
 import os
+import random
+import threading
 
+from backend.app.batch import BatchExtractor
+from backend.app.cache import DiskCache, LRUCache, content_key
+from backend.app.events import EventLog
 from backend.app.extraction import Extractor
-from backend.app.validators import validate_memory, ValidationError
-from backend.app.personality import PersonalityEngine
+from backend.app.merge import MemoryMerger
+from backend.app.validators import (
+    validate_memory, validate_memory_changes, item_counts, appended_since, ValidationError
+)
+from backend.app.personality import PersonalityEngine, MEMORY_FIELDS
 from backend.app.llm_client import LLMClient, NoLLMAvailable
+from backend.app.state import ExtractionStateStore
+from backend.app.store import MemoryStore
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -21,9 +35,32 @@ app = FastAPI(
     version="1.0.0"
 )
 
-extractor = Extractor()
+extractor_settings = {
+    "batch_size": int(os.getenv("EXTRACT_BATCH_SIZE", 256)),
+    "n_process": int(os.getenv("EXTRACT_N_PROCESS", 1)),
+    "cache_size": int(os.getenv("ENTITY_CACHE_SIZE", 10000))
+}
+extractor = Extractor(**extractor_settings)
+batch_extractor = BatchExtractor(
+    workers=int(os.getenv("BATCH_WORKERS", 1)),
+    extractor=extractor,
+    **extractor_settings
+)
 personality_engine = PersonalityEngine()
-llm_client = LLMClient()
+response_cache = LRUCache(int(os.getenv("RESPONSE_CACHE_SIZE", 4096)))
+llm_cache = DiskCache(
+    os.getenv("LLM_CACHE_PATH", ".mindbank/llm_cache.db"),
+    ttl=float(os.getenv("LLM_CACHE_TTL", 86400)),
+    max_entries=int(os.getenv("LLM_CACHE_SIZE", 10000))
+)
+llm_client = LLMClient(cache=llm_cache)
+state_store = ExtractionStateStore(os.getenv("EXTRACTION_STATE_DIR", ".mindbank/state"))
+memory_store = MemoryStore(os.getenv("MEMORY_DB_PATH", ".mindbank/memory.db"))
+memory_merger = MemoryMerger()
+event_log = EventLog(
+    os.getenv("MEMORY_DB_PATH", ".mindbank/memory.db"),
+    snapshot_every=int(os.getenv("MEMORY_SNAPSHOT_EVERY", 500))
+)
 
 
 class Message(BaseModel):
@@ -35,19 +72,58 @@ class Message(BaseModel):
 class ExtractRequest(BaseModel):
     messages: List[Message]
     use_llm: bool = Field(default=False, description="Use LLM for extraction if available")
+    hybrid: bool = Field(default=False, description="Extract deterministically and send only unresolved or ambiguous messages to the LLM")
+    user_id: Optional[str] = Field(default=None, description="Merge the extracted memory into this user's stored memory")
+
+
+class IncrementalExtractRequest(BaseModel):
+    user_id: str
+    messages: List[Message]
+    reset: bool = Field(default=False, description="Discard the stored checkpoint before extracting")
+
+
+class Conversation(BaseModel):
+    user_id: str
+    messages: List[Message]
+
+
+class BatchExtractRequest(BaseModel):
+    conversations: List[Conversation]
 
 
 class RewriteRequest(BaseModel):
     text: str
     personality: str = Field(..., description="One of: calm_mentor, witty_friend, therapist")
     use_llm: bool = Field(default=False, description="Use LLM for rewriting if available")
+    seed: Optional[int] = Field(default=None, description="Make deterministic rewriting reproducible")
+
+
+class BatchRewriteRequest(BaseModel):
+    texts: List[str]
+    personality: str = Field(..., description="One of: calm_mentor, witty_friend, therapist")
+    use_llm: bool = Field(default=False, description="Use LLM for rewriting if available")
+    seed: Optional[int] = Field(default=None, description="Rewrite every text as /rewrite would with this seed")
 
 
 class GenerateResponseRequest(BaseModel):
-    memory: Dict[str, Any]
+    memory: Optional[Dict[str, Any]] = Field(default=None, description="Inline memory; omit to load it by user_id")
+    user_id: Optional[str] = Field(default=None, description="Load the stored memory of this user")
     user_message: str
     personality: str = Field(..., description="One of: calm_mentor, witty_friend, therapist")
     use_llm: bool = Field(default=False, description="Use LLM for generation")
+    seed: Optional[int] = Field(default=None, description="Make deterministic responses reproducible and cacheable")
+
+
+class ResponsePrompt(BaseModel):
+    user_message: str
+    personality: str = Field(..., description="One of: calm_mentor, witty_friend, therapist")
+
+
+class BatchGenerateResponseRequest(BaseModel):
+    memory: Optional[Dict[str, Any]] = Field(default=None, description="Inline memory; omit to load it by user_id")
+    user_id: Optional[str] = Field(default=None, description="Load the stored memory of this user")
+    prompts: List[ResponsePrompt]
+    use_llm: bool = Field(default=False, description="Use LLM for generation")
 
 
 @app.get("/")
@@ -55,45 +131,144 @@ def root():
     return FileResponse("frontend/index.html")
 
 
+def warm_up():
+    try:
+        extractor.warm_up()
+        llm_client.warm_up()
+        logger.info("Warm-up complete")
+    except Exception as e:
+        logger.error(f"Warm-up failed: {e}")
+
+
+@app.on_event("startup")
+def startup():
+    if os.getenv("WARM_UP", "1") == "1":
+        threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+
+
 @app.get("/health")
 def health():
     return {
         "status": "healthy",
+        "ready": extractor.is_ready(),
         "llm_available": llm_client.is_available(),
         "components": {
-            "extractor": "operational",
+            "extractor": "operational" if extractor.is_ready() else "loading",
             "personality_engine": "operational",
             "validator": "operational"
+        },
+        "caches": {
+            "entities": extractor.entity_cache.stats(),
+            "memory_indexes": personality_engine.index_cache.stats(),
+            "responses": response_cache.stats(),
+            "llm": llm_cache.stats()
         }
     }
 
 
+@app.get("/ready")
+def ready():
+    if not extractor.is_ready():
+        raise HTTPException(status_code=503, detail="Extractor is still loading")
+    return {"ready": True}
+
+
+def validated(memory: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        validate_memory(memory)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=f"Memory validation failed: {str(e)}")
+    return memory
+
+
+def store_extracted(memory: Dict[str, Any], user_id: Optional[str], validate: bool = True) -> Dict[str, Any]:
+    # validate=False is for callers that already validated what they add.
+    # The update is checked before merging: the merger assumes well-formed
+    # items, and malformed LLM output must come back as a 422, not a 500.
+    if validate:
+        validated(memory)
+    if not user_id:
+        return memory
+    
+    # Load, merge, save and log in one write transaction, so concurrent
+    # extractions for the same user (in any worker) each merge into the
+    # other's result instead of overwriting it, and the event log never
+    # misses or disagrees with a stored merge.
+    with memory_store.transaction(user_id) as conn:
+        stored = memory_store.load(user_id, conn=conn)
+        memory = memory_merger.merge(stored, memory)
+        if validate:
+            validated(memory)
+        memory_store.save(memory, conn=conn)
+        event_log.record(user_id, stored, memory, conn=conn)
+    return memory
+
+
+# LLM-backed handlers are async so a pending API call only holds a
+# coroutine; spaCy, SQLite and other blocking work goes to the threadpool.
+async def extract_hybrid(messages: List[Dict[str, Any]], user_id: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    status = await run_in_threadpool(extractor.triage, messages)
+    resolved = [msg for msg in messages if status.get(msg["index"]) == "resolved"]
+    escalated = [msg for msg in messages if status.get(msg["index"]) in ("ambiguous", "unresolved")]
+    
+    # Each message is explained by exactly one extractor, so a negated
+    # "I'm not vegetarian anymore" never reaches the regex rules.
+    memory = await run_in_threadpool(extractor.extract, resolved, user_id=user_id)
+    if escalated:
+        # Malformed LLM output is treated like a failed call: the merger
+        # assumes well-formed items, and the resolved messages still count.
+        try:
+            llm_memory = await llm_client.aextract_memories(escalated, user_id=user_id)
+            validate_memory(llm_memory)
+        except (NoLLMAvailable, ValidationError) as e:
+            logger.warning(f"LLM extraction failed: {e}. Extracting escalated messages deterministically.")
+            llm_memory = await run_in_threadpool(extractor.extract, escalated, user_id=user_id)
+        memory = memory_merger.merge(memory, llm_memory)
+    
+    counts = Counter(status.values())
+    return memory, {
+        "messages": len(status),
+        "escalated": len(escalated),
+        "ambiguous": counts["ambiguous"],
+        "unresolved": counts["unresolved"],
+        "fraction": round(len(escalated) / len(status), 4) if status else 0.0
+    }
+
+
 @app.post("/extract")
-def extract_memories(request: ExtractRequest):
+async def extract_memories(request: ExtractRequest):
     try:
         messages_list = [msg.dict() for msg in request.messages]
+        user_id = request.user_id or "default_user"
         
-        if request.use_llm and llm_client.is_available():
+        escalation = None
+        if request.hybrid and llm_client.is_available():
+            logger.info("Using hybrid extraction")
+            method = "hybrid"
+            memory, escalation = await extract_hybrid(messages_list, user_id)
+        elif request.use_llm and llm_client.is_available():
             logger.info("Using LLM for extraction")
+            method = "llm"
             try:
-                memory = llm_client.extract_memories(messages_list)
+                memory = await llm_client.aextract_memories(messages_list, user_id=user_id)
             except NoLLMAvailable as e:
                 logger.warning(f"LLM extraction failed: {e}. Falling back to deterministic.")
-                memory = extractor.extract(messages_list)
+                memory = await run_in_threadpool(extractor.extract, messages_list, user_id=user_id)
         else:
             logger.info("Using deterministic extraction")
-            memory = extractor.extract(messages_list)
+            method = "deterministic"
+            memory = await run_in_threadpool(extractor.extract, messages_list, user_id=user_id)
         
-        try:
-            validate_memory(memory)
-        except ValidationError as e:
-            raise HTTPException(status_code=422, detail=f"Memory validation failed: {str(e)}")
+        memory = await run_in_threadpool(store_extracted, memory, request.user_id)
         
-        return {
+        result = {
             "success": True,
             "memory": memory,
-            "method": "llm" if (request.use_llm and llm_client.is_available()) else "deterministic"
+            "method": method
         }
+        if escalation is not None:
+            result["escalation"] = escalation
+        return result
     
     except HTTPException:
         raise
@@ -102,8 +277,141 @@ def extract_memories(request: ExtractRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/extract/incremental")
+def extract_memories_incremental(request: IncrementalExtractRequest):
+    try:
+        messages_list = [msg.dict() for msg in request.messages]
+        
+        with state_store.lock(request.user_id):
+            state = None if request.reset else state_store.load(request.user_id)
+            if state is None:
+                state = extractor.new_state(request.user_id)
+            
+            previous_index = state["last_index"]
+            previous_counts = item_counts(state["memory"])
+            memory = extractor.extract_incremental(messages_list, state)
+            
+            try:
+                validate_memory_changes(memory, appended_since(memory, previous_counts))
+            except ValidationError as e:
+                raise HTTPException(status_code=422, detail=f"Memory validation failed: {str(e)}")
+            
+            # Merge into the stored memory like /extract does, before moving
+            # the checkpoint: a failed store leaves the messages to be redone.
+            memory = store_extracted(memory, request.user_id, validate=False)
+            state_store.save(request.user_id, state)
+        
+        return {
+            "success": True,
+            "memory": memory,
+            "method": "deterministic",
+            "processed_messages": sum(1 for msg in messages_list if msg["index"] > previous_index),
+            "last_index": state["last_index"]
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Incremental extraction error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/extract/batch")
+def extract_memories_batch(request: BatchExtractRequest):
+    conversations = [conversation.dict() for conversation in request.conversations]
+    logger.info(f"Batch extraction of {len(conversations)} conversations")
+    
+    def stream():
+        for result in batch_extractor.extract_many(conversations):
+            yield json.dumps(result) + "\n"
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    batch_extractor.close()
+    memory_store.close()
+    event_log.close()
+    await llm_client.aclose()
+    llm_cache.close()
+
+
+@app.get("/memory/{user_id}")
+def get_memory(
+    user_id: str,
+    category: Optional[List[str]] = Query(default=None),
+    pattern: Optional[List[str]] = Query(default=None),
+    fact_type: Optional[List[str]] = Query(default=None)
+):
+    keys = {"preferences": category, "emotional_patterns": pattern, "facts": fact_type}
+    memory = memory_store.load(user_id, keys={field: values for field, values in keys.items() if values})
+    if memory is None:
+        raise HTTPException(status_code=404, detail=f"No stored memory for user: {user_id}")
+    return {"success": True, "memory": memory}
+
+
+async def resolve_memory(memory: Optional[Dict[str, Any]], user_id: Optional[str]):
+    if memory is not None:
+        return memory, None
+    if not user_id:
+        raise HTTPException(status_code=400, detail="Either memory or user_id is required")
+    memory = await run_in_threadpool(memory_store.load, user_id, fields=MEMORY_FIELDS)
+    if memory is None:
+        raise HTTPException(status_code=404, detail=f"No stored memory for user: {user_id}")
+    return memory, (user_id, memory["generated_at"])
+
+
+def memory_fingerprint(memory: Dict[str, Any]) -> bytes:
+    return content_key(json.dumps(memory, sort_keys=True, default=str))
+
+
+async def personalize(text: str, personality: str, use_llm: bool, rng: Optional[random.Random] = None) -> str:
+    if use_llm and llm_client.is_available():
+        try:
+            return await llm_client.arewrite_with_personality(text, personality)
+        except NoLLMAvailable as e:
+            logger.warning(f"LLM rewrite failed: {e}. Falling back to deterministic.")
+    return personality_engine.rewrite(text, personality, rng)
+
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream_personalized(text: str, personality: str, use_llm: bool, rng: Optional[random.Random],
+                              meta: Dict[str, Any]) -> AsyncIterator[str]:
+    # Events: "meta" first, then "token" pieces to append, then "done" with
+    # the full text. If the LLM stream breaks part-way, "fallback" carries
+    # the deterministic rewrite that replaces whatever was shown so far.
+    method = "llm" if use_llm and llm_client.is_available() else "deterministic"
+    yield sse("meta", {**meta, "personality": personality, "method": method})
+    
+    if method == "llm":
+        parts = []
+        try:
+            async for token in llm_client.astream_rewrite(text, personality):
+                parts.append(token)
+                yield sse("token", {"text": token})
+            yield sse("done", {"text": "".join(parts).strip(), "method": "llm"})
+            return
+        except NoLLMAvailable as e:
+            logger.warning(f"LLM rewrite stream failed: {e}. Falling back to deterministic.")
+            rewritten = personality_engine.rewrite(text, personality, rng)
+            yield sse("fallback", {"text": rewritten})
+            yield sse("done", {"text": rewritten, "method": "deterministic"})
+            return
+    
+    rewritten = personality_engine.rewrite(text, personality, rng)
+    yield sse("token", {"text": rewritten})
+    yield sse("done", {"text": rewritten, "method": "deterministic"})
+
+
 @app.post("/generate-response")
-def generate_response(request: GenerateResponseRequest):
+async def generate_response(request: GenerateResponseRequest):
     valid_personalities = ["calm_mentor", "witty_friend", "therapist"]
     if request.personality not in valid_personalities:
         raise HTTPException(
@@ -111,22 +419,42 @@ def generate_response(request: GenerateResponseRequest):
             detail=f"Invalid personality. Must be one of: {', '.join(valid_personalities)}"
         )
     
+    memory, memory_key = await resolve_memory(request.memory, request.user_id)
+    use_llm = request.use_llm and llm_client.is_available()
+    
+    # Seeded deterministic responses are a pure function of memory, message,
+    # personality and seed, so they can be served from the cache.
+    cache_key = None
+    if request.seed is not None and not use_llm:
+        if memory_key is None:
+            memory_key = memory_fingerprint(memory)
+        cache_key = (memory_key, request.user_message, request.personality, request.seed)
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            base_response, personalized = cached
+            return {
+                "success": True,
+                "base_response": base_response,
+                "personalized_response": personalized,
+                "personality": request.personality,
+                "method": "deterministic"
+            }
+    
     try:
+        rng = random.Random(request.seed) if request.seed is not None else None
         base_response = personality_engine.generate_memory_aware_response(
-            request.memory, 
-            request.user_message
+            memory, 
+            request.user_message,
+            memory_key=memory_key,
+            rng=rng
         )
-        
-        if request.use_llm and llm_client.is_available():
+        if use_llm:
             logger.info(f"Using LLM for response generation with personality: {request.personality}")
-            try:
-                personalized = llm_client.rewrite_with_personality(base_response, request.personality)
-            except NoLLMAvailable as e:
-                logger.warning(f"LLM rewrite failed: {e}. Falling back to deterministic.")
-                personalized = personality_engine.rewrite(base_response, request.personality)
         else:
             logger.info(f"Using deterministic rewriting with personality: {request.personality}")
-            personalized = personality_engine.rewrite(base_response, request.personality)
+        personalized = await personalize(base_response, request.personality, request.use_llm, rng)
+        if cache_key is not None:
+            response_cache.put(cache_key, (base_response, personalized))
         
         return {
             "success": True,
@@ -143,8 +471,75 @@ def generate_response(request: GenerateResponseRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/generate-response/stream")
+async def generate_response_stream(request: GenerateResponseRequest):
+    valid_personalities = ["calm_mentor", "witty_friend", "therapist"]
+    if request.personality not in valid_personalities:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid personality. Must be one of: {', '.join(valid_personalities)}"
+        )
+    
+    memory, memory_key = await resolve_memory(request.memory, request.user_id)
+    rng = random.Random(request.seed) if request.seed is not None else None
+    try:
+        base_response = personality_engine.generate_memory_aware_response(
+            memory,
+            request.user_message,
+            memory_key=memory_key,
+            rng=rng
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    events = stream_personalized(base_response, request.personality, request.use_llm, rng,
+                                 {"base_response": base_response})
+    return StreamingResponse(events, media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@app.post("/generate-response/batch")
+async def generate_response_batch(request: BatchGenerateResponseRequest):
+    valid_personalities = ["calm_mentor", "witty_friend", "therapist"]
+    invalid = sorted({prompt.personality for prompt in request.prompts} - set(valid_personalities))
+    if invalid:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid personality {', '.join(invalid)}. Must be one of: {', '.join(valid_personalities)}"
+        )
+    
+    memory, memory_key = await resolve_memory(request.memory, request.user_id)
+    
+    try:
+        base_responses = personality_engine.generate_memory_aware_responses(
+            memory,
+            [prompt.user_message for prompt in request.prompts],
+            memory_key=memory_key
+        )
+        method = "llm" if (request.use_llm and llm_client.is_available()) else "deterministic"
+        logger.info(f"Generating {len(request.prompts)} responses, method: {method}")
+        personalized = await asyncio.gather(*[
+            personalize(base_response, prompt.personality, request.use_llm)
+            for prompt, base_response in zip(request.prompts, base_responses)
+        ])
+        responses = [
+            {
+                "user_message": prompt.user_message,
+                "base_response": base_response,
+                "personalized_response": text,
+                "personality": prompt.personality
+            }
+            for prompt, base_response, text in zip(request.prompts, base_responses, personalized)
+        ]
+        
+        return {"success": True, "responses": responses, "method": method}
+    
+    except Exception as e:
+        logger.error(f"Batch response generation error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.post("/rewrite")
-def rewrite_text(request: RewriteRequest):
+async def rewrite_text(request: RewriteRequest):
     valid_personalities = ["calm_mentor", "witty_friend", "therapist"]
     if request.personality not in valid_personalities:
         raise HTTPException(
@@ -153,16 +548,17 @@ def rewrite_text(request: RewriteRequest):
         )
     
     try:
+        rng = random.Random(request.seed) if request.seed is not None else None
         if request.use_llm and llm_client.is_available():
             logger.info(f"Using LLM for rewriting with personality: {request.personality}")
             try:
-                rewritten = llm_client.rewrite_with_personality(request.text, request.personality)
+                rewritten = await llm_client.arewrite_with_personality(request.text, request.personality)
             except NoLLMAvailable as e:
                 logger.warning(f"LLM rewrite failed: {e}. Falling back to deterministic.")
-                rewritten = personality_engine.rewrite(request.text, request.personality)
+                rewritten = personality_engine.rewrite(request.text, request.personality, rng)
         else:
             logger.info(f"Using deterministic rewriting with personality: {request.personality}")
-            rewritten = personality_engine.rewrite(request.text, request.personality)
+            rewritten = personality_engine.rewrite(request.text, request.personality, rng)
         
         return {
             "success": True,
@@ -181,10 +577,60 @@ def rewrite_text(request: RewriteRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/rewrite/stream")
+async def rewrite_text_stream(request: RewriteRequest):
+    valid_personalities = ["calm_mentor", "witty_friend", "therapist"]
+    if request.personality not in valid_personalities:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid personality. Must be one of: {', '.join(valid_personalities)}"
+        )
+    
+    rng = random.Random(request.seed) if request.seed is not None else None
+    events = stream_personalized(request.text, request.personality, request.use_llm, rng,
+                                 {"original": request.text})
+    return StreamingResponse(events, media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@app.post("/rewrite/batch")
+async def rewrite_batch(request: BatchRewriteRequest):
+    valid_personalities = ["calm_mentor", "witty_friend", "therapist"]
+    if request.personality not in valid_personalities:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid personality. Must be one of: {', '.join(valid_personalities)}"
+        )
+    
+    try:
+        use_llm = request.use_llm and llm_client.is_available()
+        logger.info(f"Rewriting {len(request.texts)} texts with personality: {request.personality}")
+        if use_llm:
+            rewritten = await asyncio.gather(*[
+                personalize(text, request.personality, True,
+                            random.Random(request.seed) if request.seed is not None else None)
+                for text in request.texts
+            ])
+        else:
+            rewritten = personality_engine.rewrite_many(request.texts, request.personality, request.seed)
+        
+        return {
+            "success": True,
+            "rewritten": rewritten,
+            "personality": request.personality,
+            "method": "llm" if use_llm else "deterministic"
+        }
+    
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Batch rewrite error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 app.mount("/", StaticFiles(directory="frontend", html=True), name="frontend")
 
 
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=port)
@@ -0,0 +1,127 @@
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    # Minimal OpenAI-compatible /chat/completions endpoint. JSON-mode
+    # requests get `extraction` back (called with the request body if it is
+    # a function); other requests get the user prompt echoed with a
+    # "Rewritten: " prefix. Batched rewrites get each text echoed as if it
+    # had been sent on its own. Streaming requests get the reply one word per
+    # SSE chunk, or an error event after `stream_fail_after` chunks.
+    # `max_in_flight` is the most requests the server has held at once.
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeOpenAIHandler)
+        self.delay = 0.0
+        self.requests = []
+        self.client_ports = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.stream_fail_after = None
+        self.lock = threading.Lock()
+        self.extraction = {
+            "preferences": [{"category": "food", "value": "vegetarian", "confidence": 0.9, "source_messages": [0]}],
+            "emotional_patterns": [],
+            "facts": []
+        }
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with self.server.lock:
+            self.server.requests.append(body)
+            self.server.client_ports.add(self.client_address[1])
+            self.server.in_flight += 1
+            self.server.max_in_flight = max(self.server.max_in_flight, self.server.in_flight)
+        time.sleep(self.server.delay)
+        with self.server.lock:
+            self.server.in_flight -= 1
+
+        batch = self.batch_texts(body)
+        if batch is not None:
+            content = json.dumps({"rewrites": [f"Rewritten: Rewrite this: {text}" for text in batch]})
+        elif body.get("response_format", {}).get("type") == "json_object":
+            extraction = self.server.extraction
+            content = json.dumps(extraction(body) if callable(extraction) else extraction)
+        else:
+            content = "Rewritten: " + body["messages"][-1]["content"]
+        if body.get("stream"):
+            self.stream(body, content)
+            return
+
+        payload = json.dumps({
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body["model"],
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }]
+        }).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def stream(self, body, content):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        for position, word in enumerate(re.findall(r"\S+\s*", content)):
+            if position == self.server.stream_fail_after:
+                self.wfile.write(b'data: {"error": {"message": "stream interrupted"}}\n\n')
+                return
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body["model"],
+                "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}]
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    @staticmethod
+    def batch_texts(body):
+        if body.get("response_format", {}).get("type") != "json_object":
+            return None
+        try:
+            return json.loads(body["messages"][-1]["content"])["texts"]
+        except (ValueError, KeyError, TypeError):
+            return None
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def fake_openai():
+    server = FakeOpenAIServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,57 @@
+import json
+import pytest
+from pathlib import Path
+from backend.app.batch import BatchExtractor
+from backend.app.extraction import Extractor
+
+
+@pytest.fixture
+def sample_messages():
+    messages_path = Path(__file__).parent.parent / "examples" / "30_messages.json"
+    with open(messages_path, "r") as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def conversations(sample_messages):
+    return [
+        {"user_id": f"user-{i}", "messages": sample_messages[i * 5:(i + 1) * 5]}
+        for i in range(6)
+    ]
+
+
+def strip_timestamps(results):
+    for result in results:
+        result["memory"].pop("generated_at")
+    return sorted(results, key=lambda result: result["position"])
+
+
+def test_inline_batch_matches_single_extraction(conversations):
+    extractor = Extractor()
+    results = strip_timestamps(list(BatchExtractor(workers=0, extractor=extractor).extract_many(conversations)))
+    
+    assert [result["user_id"] for result in results] == [c["user_id"] for c in conversations]
+    for result, conversation in zip(results, conversations):
+        assert result["success"] is True
+        expected = extractor.extract(conversation["messages"], user_id=conversation["user_id"])
+        expected.pop("generated_at")
+        assert result["memory"] == expected
+
+
+def test_process_pool_batch_matches_inline(conversations):
+    pooled = BatchExtractor(workers=2, max_pending=2)
+    try:
+        pool_results = strip_timestamps(list(pooled.extract_many(conversations)))
+    finally:
+        pooled.close()
+    inline_results = strip_timestamps(list(BatchExtractor(workers=0).extract_many(conversations)))
+    
+    assert pool_results == inline_results
+
+
+def test_batch_reports_failed_conversations():
+    results = list(BatchExtractor(workers=0).extract_many([{"user_id": "broken", "messages": [{"role": "user"}]}]))
+    
+    assert results[0]["success"] is False
+    assert results[0]["user_id"] == "broken"
+    assert "error" in results[0]
@@ -0,0 +1,158 @@
+import multiprocessing
+import os
+
+from backend.app.cache import DiskCache, LRUCache, content_key
+
+
+def test_content_key_is_stable_and_distinct():
+    assert content_key("I'm vegetarian") == content_key("I'm vegetarian")
+    assert content_key("I'm vegetarian") != content_key("I'm vegan")
+
+
+def test_get_counts_hits_and_misses():
+    cache = LRUCache(max_entries=2)
+    cache.put("a", 1)
+    
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_zero_size_cache_stores_nothing():
+    cache = LRUCache(max_entries=0)
+    cache.put("a", 1)
+    
+    assert len(cache) == 0
+    assert cache.get("a") is None
+
+
+def test_disk_cache_round_trip_and_stats(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache.db"))
+    key = content_key("prompt")
+    assert cache.get(key) is None
+    cache.put(key, "completion")
+    
+    assert cache.get(key) == "completion"
+    stats = cache.stats()
+    assert stats["size"] == 1
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_disk_cache_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "cache.db")
+    writer = DiskCache(path)
+    reader = DiskCache(path)
+    writer.put(b"key", "value")
+    
+    assert reader.get(b"key") == "value"
+
+
+def test_disk_cache_expires_entries(tmp_path, monkeypatch):
+    import backend.app.cache as cache_module
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+    cache = DiskCache(str(tmp_path / "cache.db"), ttl=60)
+    cache.put(b"old", "value")
+    
+    now[0] += 59
+    assert cache.get(b"old") == "value"
+    now[0] += 2
+    assert cache.get(b"old") is None
+    
+    cache.put(b"new", "value")
+    assert len(cache) == 1
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path, monkeypatch):
+    import backend.app.cache as cache_module
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+    cache = DiskCache(str(tmp_path / "cache.db"), max_entries=2)
+    for key in [b"a", b"b"]:
+        now[0] += 1
+        cache.put(key, "value")
+    now[0] += 1
+    cache.get(b"a")
+    now[0] += 1
+    cache.put(b"c", "value")
+    
+    assert cache.get(b"b") is None
+    assert cache.get(b"a") == "value"
+    assert cache.get(b"c") == "value"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_disk_cache_get_does_not_write(tmp_path, monkeypatch):
+    import backend.app.cache as cache_module
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+    cache = DiskCache(str(tmp_path / "cache.db"))
+    cache.put(b"a", "value")
+    
+    now[0] += 1
+    assert cache.get(b"a") == "value"
+    assert not cache.conn.in_transaction
+    assert cache.conn.execute("SELECT accessed_at FROM cache_entries").fetchone() == (1000.0,)
+    
+    # The access time is written with the next put.
+    now[0] += 1
+    cache.put(b"b", "value")
+    assert cache.conn.execute("SELECT accessed_at FROM cache_entries WHERE key = ?", (b"a",)).fetchone() == (1001.0,)
+
+
+def test_disk_cache_enforces_its_size_every_few_puts(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache.db"), max_entries=500)
+    assert cache.evict_every == 5
+    for index in range(503):
+        cache.put(str(index).encode(), "value")
+    assert len(cache) == 503
+    cache.put(b"503", "value")
+    cache.put(b"504", "value")
+    assert len(cache) == 500
+    assert cache.stats()["evictions"] == 5
+
+
+def test_disk_cache_with_zero_size_stores_nothing(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache.db"), max_entries=0)
+    cache.put(b"key", "value")
+    assert cache.get(b"key") is None
+
+
+def put_in_child(cache, pids):
+    cache.put(content_key("child"), "from the child")
+    pids.put((os.getpid(), cache.db._pid))
+
+
+def test_disk_cache_reconnects_after_fork(tmp_path):
+    path = tmp_path / "cache.db"
+    cache = DiskCache(str(path))
+    assert not path.exists()
+    cache.put(content_key("parent"), "from the parent")
+    
+    context = multiprocessing.get_context("fork")
+    pids = context.Queue()
+    child = context.Process(target=put_in_child, args=(cache, pids))
+    child.start()
+    child.join()
+    
+    child_pid, connection_pid = pids.get(timeout=5)
+    assert connection_pid == child_pid != cache.db._pid
+    assert cache.get(content_key("child")) == "from the child"
+    cache.close()
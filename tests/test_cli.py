@@ -0,0 +1,61 @@
+import json
+import pytest
+from backend.app.cli import main
+
+
+@pytest.fixture
+def export_file(tmp_path):
+    path = tmp_path / "export.jsonl"
+    conversations = [
+        {"user_id": "alice", "messages": [{"index": 0, "role": "user", "content": "I'm vegetarian"}]},
+        {"user_id": "bob", "messages": [{"index": 0, "role": "user", "content": "I live in Berlin"}]},
+        {"user_id": "carol", "messages": [{"index": 0, "role": "user", "content": "Feeling stressed today"}]},
+    ]
+    with open(path, "w") as f:
+        for conversation in conversations:
+            f.write(json.dumps(conversation) + "\n")
+    return path
+
+
+def read_results(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_cli_writes_one_memory_per_conversation(export_file, tmp_path, capsys):
+    output = tmp_path / "memories.jsonl"
+    
+    assert main([str(export_file), "-o", str(output), "-w", "0"]) == 0
+    
+    results = read_results(output)
+    assert sorted(result["user_id"] for result in results) == ["alice", "bob", "carol"]
+    assert all(result["success"] for result in results)
+    assert "conv/s" in capsys.readouterr().err
+
+
+def test_cli_skips_malformed_lines(export_file, tmp_path, capsys):
+    with open(export_file, "a") as f:
+        f.write("not json\n")
+        f.write(json.dumps({"user_id": "no-messages"}) + "\n")
+    output = tmp_path / "memories.jsonl"
+    
+    assert main([str(export_file), "-o", str(output), "-w", "0"]) == 1
+    
+    assert len(read_results(output)) == 3
+    err = capsys.readouterr().err
+    assert "line 4: skipped" in err
+    assert "line 5: skipped" in err
+
+
+@pytest.mark.parametrize("messages", [None, 42, "I'm vegetarian", {"content": "hi"}])
+def test_cli_skips_lines_whose_messages_are_not_a_list(export_file, tmp_path, capsys, messages):
+    with open(export_file, "a") as f:
+        f.write(json.dumps({"user_id": "dave", "messages": messages}) + "\n")
+    output = tmp_path / "memories.jsonl"
+    
+    assert main([str(export_file), "-o", str(output), "-w", "0"]) == 1
+    
+    assert len(read_results(output)) == 3
+    err = capsys.readouterr().err
+    assert "line 4: skipped (messages must be a list" in err
+    assert "3 messages" in err
@@ -0,0 +1,134 @@
+import json
+import sqlite3
+import threading
+import pytest
+from pathlib import Path
+from backend.app.events import EventLog, diff_events, apply_events
+from backend.app.extraction import Extractor
+from backend.app.merge import MemoryMerger
+
+
+@pytest.fixture
+def sample_messages():
+    messages_path = Path(__file__).parent.parent / "examples" / "30_messages.json"
+    with open(messages_path, "r") as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def log():
+    log = EventLog(":memory:", snapshot_every=20)
+    yield log
+    log.close()
+
+
+def history(sample_messages, sessions):
+    # The same 30 messages re-sent as many sessions with shifting indices.
+    for session in range(sessions):
+        yield [
+            {**msg, "index": msg["index"] + session * len(sample_messages)}
+            for msg in sample_messages[session % 6 * 5:session % 6 * 5 + 10]
+        ]
+
+
+def record_history(log, extractor, merger, sample_messages, sessions):
+    memory = None
+    for messages in history(sample_messages, sessions):
+        merged = merger.merge(memory, extractor.extract(messages, user_id="alice"))
+        log.record("alice", memory, merged)
+        memory = merged
+    return memory
+
+
+def test_diff_and_apply_round_trip():
+    before = {
+        "user_id": "alice", "generated_at": "t1",
+        "preferences": [
+            {"category": "food", "value": "vegetarian", "confidence": 0.8, "source_messages": [1]},
+            {"category": "music", "value": "lo-fi", "confidence": 0.5, "source_messages": [2]}
+        ],
+        "emotional_patterns": [], "facts": [], "raw_extractions": []
+    }
+    after = json.loads(json.dumps(before))
+    after["generated_at"] = "t2"
+    after["preferences"][0].update(confidence=0.9, source_messages=[1, 7])
+    del after["preferences"][1]
+    after["facts"].append({"fact_type": "location", "value": "Berlin", "confidence": 0.88, "source_messages": [3]})
+    
+    events = diff_events(before, after)
+    assert {event["type"] for event in events} == {"confidence_changed", "evicted", "added", "generated"}
+    assert apply_events(json.loads(json.dumps(before)), events, "alice") == after
+
+
+def test_rebuild_matches_live_memory_across_snapshots(log, sample_messages):
+    merger = MemoryMerger(limits={"facts": 5, "preferences": 8})
+    memory = record_history(log, Extractor(), merger, sample_messages, sessions=12)
+    
+    assert log.tail_length("alice") < log.snapshot_every
+    assert log.rebuild("alice") == memory
+    
+    log.prune("alice")
+    assert log.rebuild("alice") == memory
+
+
+def test_rebuild_unknown_user_returns_none(log):
+    assert log.rebuild("nobody") is None
+
+
+def test_apply_events_treats_change_to_unknown_item_as_add():
+    events = [{
+        "type": "confidence_changed",
+        "field": "preferences",
+        "key": ["food", "coffee lover"],
+        "changes": {"confidence": 0.9, "source_messages": [1, 4]}
+    }]
+    memory = apply_events(None, events, "bob")
+    assert memory["preferences"] == [
+        {"category": "food", "value": "coffee lover", "confidence": 0.9, "source_messages": [1, 4]}
+    ]
+
+
+def test_concurrent_writers_get_distinct_seqs(tmp_path):
+    # Separate logs on one file have separate connections, like worker processes.
+    path = str(tmp_path / "memory.db")
+    logs = [EventLog(path) for _ in range(4)]
+    errors = []
+    
+    def write(log, worker):
+        try:
+            for round_ in range(25):
+                after = {"user_id": "alice", "generated_at": f"{worker}-{round_}", "facts": [
+                    {"fact_type": "misc", "value": f"{worker}-{round_}", "confidence": 0.5, "source_messages": [round_]}
+                ]}
+                log.record("alice", None, after)
+        except Exception as e:
+            errors.append(e)
+    
+    threads = [threading.Thread(target=write, args=(log, worker)) for worker, log in enumerate(logs)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert errors == []
+    assert logs[0].tail_length("alice") == 200
+    assert len(logs[0].rebuild("alice")["facts"]) == 100
+    for log in logs:
+        log.close()
+
+
+def test_record_in_a_caller_transaction_on_a_fresh_file(tmp_path):
+    # The caller's connection never ran EventLog's setup; the tables exist
+    # because EventLog created them when it was built.
+    path = str(tmp_path / "memory.db")
+    log = EventLog(path)
+    conn = sqlite3.connect(path)
+    after = {"user_id": "alice", "generated_at": "t1", "facts": [
+        {"fact_type": "location", "value": "Berlin", "confidence": 0.88, "source_messages": [0]}
+    ]}
+    with conn:
+        assert log.record("alice", None, after, conn=conn) == 2
+    conn.close()
+    
+    assert log.rebuild("alice")["facts"] == after["facts"]
+    log.close()
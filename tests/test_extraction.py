@@ -2,7 +2,8 @@ import json
 import pytest
 from pathlib import Path
 from backend.app.extraction import Extractor
-from backend.app.validators import validate_memory, ValidationError
+from backend.app import validators
+from backend.app.validators import validate_memory, validate_many, ValidationError
 
 
 @pytest.fixture
@@ -78,6 +79,43 @@ def test_validate_memory_rejects_invalid_data():
         validate_memory(invalid_memory)
 
 
+def test_validate_memory_reports_error_path(extractor, sample_messages):
+    memory = extractor.extract(sample_messages)
+    memory["preferences"][0]["confidence"] = 1.5
+    
+    with pytest.raises(ValidationError) as exc_info:
+        validate_memory(memory)
+    
+    assert exc_info.value.path == ("preferences", 0, "confidence")
+    assert "preferences/0/confidence" in str(exc_info.value)
+
+
+def test_validate_memory_compiles_schema_once(extractor, sample_messages, monkeypatch):
+    memory = extractor.extract(sample_messages)
+    validate_memory(memory)
+    
+    monkeypatch.setattr(validators.json, "load", lambda f: pytest.fail("schema re-read"))
+    validate_memory(memory)
+
+
+def test_validate_many_returns_error_per_memory(extractor, sample_messages):
+    valid = extractor.extract(sample_messages)
+    invalid = {"user_id": "test"}
+    
+    errors = validate_many([valid, invalid, valid])
+    assert errors[0] is None and errors[2] is None
+    assert isinstance(errors[1], ValidationError)
+
+
+def test_validate_memory_without_fast_backend(extractor, sample_messages, monkeypatch):
+    validator, _ = validators.compiled_validators()
+    monkeypatch.setattr(validators, "compiled_validators", lambda: (validator, None))
+    
+    validate_memory(extractor.extract(sample_messages))
+    with pytest.raises(ValidationError):
+        validate_memory({"user_id": "test"})
+
+
 def test_extract_deduplicates_entries(extractor):
     messages = [
         {"index": 0, "role": "user", "content": "I'm vegetarian"},
@@ -87,4 +125,151 @@ def test_extract_deduplicates_entries(extractor):
     
     result = extractor.extract(messages)
     vegetarian_prefs = [p for p in result["preferences"] if "vegetarian" in p["value"].lower()]
-    assert len(vegetarian_prefs) == 1
\ No newline at end of file
+    assert len(vegetarian_prefs) == 1
+
+def test_extract_entities_matches_per_message_pipeline(extractor, sample_messages):
+    texts = [msg["content"] for msg in sample_messages if msg["role"] == "user"]
+    expected = [tuple((ent.label_, ent.text) for ent in extractor.nlp(text).ents) for text in texts]
+    
+    assert extractor.extract_entities(texts) == expected
+
+
+def test_extract_entities_disables_unused_components(extractor):
+    assert "ner" not in extractor.ner_disabled
+    for name in ["tagger", "parser", "lemmatizer", "attribute_ruler"]:
+        if name in extractor.nlp.pipe_names:
+            assert name in extractor.ner_disabled
+
+
+def test_extract_with_small_batches_keeps_order(sample_messages):
+    batched = Extractor(batch_size=2).extract(sample_messages)
+    default = Extractor().extract(sample_messages)
+    
+    assert batched["facts"] == default["facts"]
+    assert batched["raw_extractions"] == default["raw_extractions"]
+
+
+def test_extract_entities_reuses_cached_messages(extractor, sample_messages):
+    texts = [msg["content"] for msg in sample_messages if msg["role"] == "user"]
+    first = extractor.extract_entities(texts)
+    misses = extractor.entity_cache.misses
+    
+    second = extractor.extract_entities(texts + ["I moved to London last year"])
+    
+    assert second[:len(texts)] == first
+    assert extractor.entity_cache.misses == misses + 1
+    assert extractor.entity_cache.hits >= len(texts)
+
+
+def test_extract_entities_with_cache_disabled(sample_messages):
+    texts = [msg["content"] for msg in sample_messages if msg["role"] == "user"]
+    uncached = Extractor(cache_size=0)
+    
+    assert uncached.extract_entities(texts) == uncached.extract_entities(texts)
+    assert len(uncached.entity_cache) == 0
+
+
+def test_extract_incremental_matches_full_extraction(extractor, sample_messages):
+    state = extractor.new_state("user-1")
+    extractor.extract_incremental(sample_messages[:10], state)
+    extractor.extract_incremental(sample_messages[:20], state)
+    incremental = extractor.extract_incremental(sample_messages, state)
+    full = extractor.extract(sample_messages, user_id="user-1")
+    
+    for key in ["preferences", "emotional_patterns", "facts", "raw_extractions"]:
+        assert incremental[key] == full[key]
+    assert state["last_index"] == sample_messages[-1]["index"]
+
+
+def test_extract_incremental_skips_processed_messages(extractor):
+    state = extractor.new_state()
+    extractor.extract_incremental([{"index": 0, "role": "user", "content": "I'm vegetarian"}], state)
+    
+    memory = extractor.extract_incremental([
+        {"index": 0, "role": "user", "content": "I love coffee"},
+        {"index": 1, "role": "user", "content": "I'm vegan"},
+    ], state)
+    
+    values = [p["value"] for p in memory["preferences"]]
+    assert "coffee lover" not in values
+    assert values.count("vegetarian") == 2
+    assert state["last_index"] == 1
+
+
+def test_triage_classifies_user_messages(extractor):
+    messages = [
+        {"index": 0, "role": "user", "content": "I'm vegetarian"},
+        {"index": 1, "role": "assistant", "content": "Noted!"},
+        {"index": 2, "role": "user", "content": "I used to be vegetarian"},
+        {"index": 3, "role": "user", "content": "Do I sound like an introvert?"},
+        {"index": 4, "role": "user", "content": "Thanks, that helps a lot"}
+    ]
+    assert extractor.triage(messages) == {
+        0: "resolved",
+        2: "ambiguous",
+        3: "ambiguous",
+        4: "unresolved"
+    }
+
+
+def test_extractor_defers_model_loading():
+    lazy = Extractor()
+    assert not lazy.is_ready()
+    
+    lazy.warm_up()
+    assert lazy.is_ready()
+    assert "ner" not in lazy.ner_disabled
+
+
+def test_validate_memory_changes_matches_full_validation(extractor, sample_messages):
+    import copy
+    import random
+    from backend.app.validators import validate_memory_changes, item_counts, appended_since, ITEM_FIELDS
+    
+    base = extractor.extract(sample_messages[:15])
+    counts = item_counts(base)
+    rng = random.Random(7)
+    corruptions = [
+        lambda item: item.update(confidence=1.5),
+        lambda item: item.pop(next(iter(item))),
+        lambda item: item.update(source_messages=["x"]),
+        lambda item: None,
+    ]
+    
+    for _ in range(50):
+        memory = copy.deepcopy(base)
+        extractor.extract_incremental(sample_messages, {
+            "last_index": 14,
+            "seen_preferences": set(), "seen_emotions": set(), "seen_facts": set(),
+            "memory": memory
+        })
+        changed = appended_since(memory, counts)
+        field = rng.choice([f for f in ITEM_FIELDS if len(changed[f])])
+        rng.choice(corruptions)(memory[field][rng.choice(changed[field])])
+        
+        try:
+            validate_memory(memory)
+            full_error = None
+        except ValidationError as e:
+            full_error = e
+        try:
+            validate_memory_changes(memory, changed)
+            delta_error = None
+        except ValidationError as e:
+            delta_error = e
+        
+        assert (full_error is None) == (delta_error is None)
+        if full_error is not None:
+            assert full_error.path == delta_error.path
+
+
+def test_validate_memory_changes_checks_envelope():
+    from backend.app.validators import validate_memory_changes
+    
+    with pytest.raises(ValidationError):
+        validate_memory_changes({"user_id": "test"}, {})
+    with pytest.raises(ValidationError):
+        validate_memory_changes({
+            "user_id": "test", "generated_at": "now", "preferences": {},
+            "emotional_patterns": [], "facts": [], "raw_extractions": []
+        }, {})
@@ -0,0 +1,118 @@
+import time
+import pytest
+from backend.app.intents import IntentRouter, TOPICS
+
+
+@pytest.fixture
+def router():
+    return IntentRouter()
+
+
+@pytest.mark.parametrize("message,topic", [
+    ("I'm so stressed about everything", "stress"),
+    ("The deadline is tomorrow", "work"),
+    ("How do I learn programming?", "learn"),
+    ("What should I eat?", "food"),
+    ("How do I communicate better?", "communication"),
+    ("My cat is sick", "pet"),
+    ("Any plans for my free time?", "weekend"),
+    ("Best workout for beginners", "exercise"),
+    ("I'm always tired", "sleep"),
+    ("Making friends is hard", "social"),
+    ("Should I move abroad?", "decision"),
+])
+def test_classifies_topics(router, message, topic):
+    assert router.classify(message) == topic
+
+
+def test_matches_whole_words_only(router):
+    assert router.classify("I'm interested in painting") is None
+    assert router.classify("That was a great concert") is None
+    assert router.classify("My dogsitter cancelled") is None
+
+
+@pytest.mark.parametrize("message,topic", [
+    ("I keep calling them back", "communication"),
+    ("We talked for hours", "communication"),
+    ("I learned a lot today", "learn"),
+    ("I'm feeling sleepy", "sleep"),
+    ("Stop stressing me out", "stress"),
+    ("I felt pressured into it", "stress"),
+    ("I cooked pasta", "food"),
+    ("Our dinners are always late", "food"),
+    ("My workload is huge", "work"),
+    ("My coworkers are loud", "work"),
+    ("My workouts are too short", "exercise"),
+])
+def test_matches_inflected_keywords(router, message, topic):
+    assert router.classify(message) == topic
+
+
+@pytest.mark.parametrize("message,topic", [
+    ("I'm completely overworked", "work"),
+    ("So much homework tonight", "work"),
+    ("Our teamwork is falling apart", "work"),
+    ("The paperwork never ends", "work"),
+    ("I felt distressed all day", "stress"),
+])
+def test_matches_listed_compounds(router, message, topic):
+    assert router.classify(message) == topic
+
+
+def test_unlisted_compounds_do_not_route(router):
+    # Keywords match at word starts only; a compound needs its own entry.
+    assert router.classify("The artwork is lovely") is None
+    assert router.classify("Any good catnip brands?") is None
+    assert router.classify("It was a breakthrough") is None
+
+
+def test_exact_keywords_do_not_match_as_prefixes(router):
+    assert router.classify("Which category fits?") is None
+    assert router.classify("That restaurant was loud") is None
+    assert router.classify("I petitioned the council") is None
+    assert router.classify("The studio opens at nine") is None
+    assert router.classify("Where should it go?") is None
+
+
+def test_first_topic_in_table_wins(router):
+    assert router.classify("Should I cook dinner after work?") == "work"
+    assert router.classify("Work is piling up and I'm anxious") == "stress"
+
+
+def test_custom_topic_table():
+    router = IntentRouter([("greeting", ["hi", "good morning"]), ("farewell", ["bye"])])
+    assert router.classify("Good morning! bye") == "greeting"
+    assert router.classify("BYE now") == "farewell"
+    assert router.classify("hiking") is None
+    assert router.topics == ["greeting", "farewell"]
+
+
+def test_custom_topic_table_with_stems():
+    router = IntentRouter([("travel", ["travel*", "trip"]), ("farewell", ["bye*"])])
+    assert router.classify("Travelling soon, byebye") == "travel"
+    assert router.classify("Byeee") == "farewell"
+    assert router.classify("tripod") is None
+
+
+def test_keywords_are_unique_across_topics():
+    keywords = [keyword.rstrip("*") for _, keywords in TOPICS for keyword in keywords]
+    assert len(keywords) == len(set(keywords))
+
+
+def test_cost_does_not_grow_with_topic_count():
+    message = "Honestly I'm not sure what to do with my life right now, any general advice? " * 5
+    small = IntentRouter()
+    large = IntentRouter(list(TOPICS) + [
+        (f"topic{i}", [f"keyword{i}x{j}" for j in range(10)]) for i in range(500)
+    ])
+
+    def best_of(router):
+        timings = []
+        for _ in range(5):
+            start = time.perf_counter()
+            for _ in range(200):
+                router.classify(message)
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    assert best_of(large) < best_of(small) * 5
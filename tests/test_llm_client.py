@@ -1,6 +1,9 @@
+import asyncio
+import json
+import re
 import pytest
 import os
-from backend.app.llm_client import LLMClient, NoLLMAvailable
+from backend.app.llm_client import LLMClient, NoLLMAvailable, chunk_messages, estimate_tokens, message_line
 
 
 @pytest.fixture
@@ -59,6 +62,14 @@ def test_rewrite_raises_for_unknown_personality(mock_api_key_client):
     assert "Unknown personality" in str(exc_info.value)
 
 
+def test_client_defers_sdk_construction(mock_api_key_client):
+    assert mock_api_key_client.is_available()
+    assert not mock_api_key_client.is_ready()
+    
+    mock_api_key_client.warm_up()
+    assert mock_api_key_client.is_ready()
+
+
 def test_close_clears_client(mock_api_key_client):
     mock_api_key_client.close()
     assert not mock_api_key_client.is_available()
@@ -113,4 +124,319 @@ def test_rewrite_with_real_api():
         assert result != text
         
     except NoLLMAvailable:
-        pytest.skip("LLM call failed")
\ No newline at end of file
+        pytest.skip("LLM call failed")
+
+def test_sync_client_against_fake_server(fake_openai, sample_messages):
+    client = LLMClient(api_key="test-key", base_url=fake_openai.base_url)
+    assert client.rewrite_with_personality("Hello", "calm_mentor") == "Rewritten: Rewrite this: Hello"
+    
+    memory = client.extract_memories(sample_messages, user_id="alice")
+    assert memory["user_id"] == "alice"
+    assert memory["preferences"][0]["value"] == "vegetarian"
+    assert "[1] user: I live in Berlin" in fake_openai.requests[-1]["messages"][1]["content"]
+
+
+def test_async_client_against_fake_server(fake_openai, sample_messages):
+    client = LLMClient(api_key="test-key", base_url=fake_openai.base_url)
+    
+    async def run():
+        rewritten = await client.arewrite_with_personality("Hello", "therapist")
+        memory = await client.aextract_memories(sample_messages, user_id="bob")
+        await client.aclose()
+        return rewritten, memory
+    
+    rewritten, memory = asyncio.run(run())
+    assert rewritten == "Rewritten: Rewrite this: Hello"
+    assert memory["user_id"] == "bob"
+    assert fake_openai.requests[0]["temperature"] == 0.7
+    assert fake_openai.requests[1]["response_format"] == {"type": "json_object"}
+
+
+def test_async_client_runs_concurrent_calls_over_a_bounded_pool(fake_openai):
+    fake_openai.delay = 0.2
+    client = LLMClient(api_key="test-key", base_url=fake_openai.base_url, max_connections=20, batch_size=1)
+    
+    async def run():
+        results = await asyncio.gather(*[
+            client.arewrite_with_personality(f"text {i}", "calm_mentor") for i in range(100)
+        ])
+        await client.aclose()
+        return results
+    
+    results = asyncio.run(run())
+    assert results == [f"Rewritten: Rewrite this: text {i}" for i in range(100)]
+    # The calls overlap up to the pool size and never beyond it.
+    assert fake_openai.max_in_flight == 20
+    assert len(fake_openai.client_ports) <= 20
+
+
+def test_async_client_is_rebuilt_for_a_new_event_loop(fake_openai):
+    client = LLMClient(api_key="test-key", base_url=fake_openai.base_url)
+    
+    async def rewrite():
+        return await client.arewrite_with_personality("Hi", "witty_friend"), client.async_client
+    
+    first, first_client = asyncio.run(rewrite())
+    second, second_client = asyncio.run(rewrite())
+    assert first == second == "Rewritten: Rewrite this: Hi"
+    assert first_client is not second_client
+
+
+def test_async_rewrite_raises_when_not_available(no_api_key_client):
+    with pytest.raises(NoLLMAvailable):
+        asyncio.run(no_api_key_client.arewrite_with_personality("Hello", "calm_mentor"))
+
+
+def test_identical_requests_are_served_from_disk_cache(fake_openai, tmp_path, sample_messages):
+    from backend.app.cache import DiskCache
+    path = str(tmp_path / "llm_cache.db")
+    client = LLMClient(api_key="test-key", base_url=fake_openai.base_url, cache=DiskCache(path))
+    
+    assert client.rewrite_with_personality("Hello", "calm_mentor") == "Rewritten: Rewrite this: Hello"
+    assert client.rewrite_with_personality("Hello", "calm_mentor") == "Rewritten: Rewrite this: Hello"
+    client.rewrite_with_personality("Hello", "therapist")
+    client.extract_memories(sample_messages)
+    assert len(fake_openai.requests) == 3
+    
+    # Another worker process opening the same file shares the entries.
+    other = LLMClient(api_key="test-key", base_url=fake_openai.base_url, cache=DiskCache(path))
+    
+    async def run():
+        rewritten = await other.arewrite_with_personality("Hello", "therapist")
+        memory = await other.aextract_memories(sample_messages, user_id="carol")
+        await other.aclose()
+        return rewritten, memory
+    
+    rewritten, memory = asyncio.run(run())
+    assert rewritten == "Rewritten: Rewrite this: Hello"
+    assert memory["user_id"] == "carol"
+    assert len(fake_openai.requests) == 3
+    assert other.cache.stats()["hits"] == 2
+
+
+def test_async_paths_use_the_disk_cache_off_the_event_loop(fake_openai, tmp_path):
+    import threading
+    from backend.app.cache import DiskCache
+    
+    class RecordingCache(DiskCache):
+        threads = set()
+        
+        def get(self, key):
+            self.threads.add(threading.get_ident())
+            return super().get(key)
+        
+        def put(self, key, value):
+            self.threads.add(threading.get_ident())
+            super().put(key, value)
+    
+    cache = RecordingCache(str(tmp_path / "llm_cache.db"))
+    client = LLMClient(api_key="test-key", base_url=fake_openai.base_url, cache=cache, batch_size=8, batch_wait=0.05)
+    
+    async def run():
+        for _ in range(2):
+            await asyncio.gather(*[client.arewrite_with_personality(f"text {i}", "calm_mentor") for i in range(3)])
+        [piece async for piece in client.astream_rewrite("Take a break", "therapist")]
+        await client.aextract_memories([{"index": 0, "role": "user", "content": "I'm vegetarian"}])
+        await client.aclose()
+        return threading.get_ident()
+    
+    loop_thread = asyncio.run(run())
+    assert cache.threads and loop_thread not in cache.threads
+
+
+def test_concurrent_rewrites_are_coalesced_per_personality(fake_openai):
+    client = LLMClient(api_key="test-key", base_url=fake_openai.base_url, batch_size=8, batch_wait=0.05)
+    
+    async def run():
+        results = await asyncio.gather(
+            *[client.arewrite_with_personality(f"text {i}", "calm_mentor") for i in range(20)],
+            *[client.arewrite_with_personality(f"note {i}", "therapist") for i in range(4)]
+        )
+        await client.aclose()
+        return results
+    
+    results = asyncio.run(run())
+    assert results == [f"Rewritten: Rewrite this: text {i}" for i in range(20)] + \
+        [f"Rewritten: Rewrite this: note {i}" for i in range(4)]
+    # 20 calm_mentor texts in groups of at most 8, plus one therapist group.
+    assert len(fake_openai.requests) == 4
+    assert all(body["response_format"] == {"type": "json_object"} for body in fake_openai.requests)
+    assert sorted(len(json.loads(body["messages"][1]["content"])["texts"]) for body in fake_openai.requests) == [4, 4, 8, 8]
+
+
+def test_coalesced_duplicates_share_one_single_request(fake_openai):
+    client = LLMClient(api_key="test-key", base_url=fake_openai.base_url, batch_size=8, batch_wait=0.05)
+    
+    async def run():
+        return await asyncio.gather(*[client.arewrite_with_personality("Hello", "witty_friend") for _ in range(5)])
+    
+    assert asyncio.run(run()) == ["Rewritten: Rewrite this: Hello"] * 5
+    assert len(fake_openai.requests) == 1
+    assert "response_format" not in fake_openai.requests[0]
+
+
+def test_malformed_batch_reply_falls_back_to_single_requests(fake_openai, monkeypatch):
+    from tests.conftest import FakeOpenAIHandler
+    monkeypatch.setattr(FakeOpenAIHandler, "batch_texts", staticmethod(lambda body: None))
+    client = LLMClient(api_key="test-key", base_url=fake_openai.base_url, batch_size=8, batch_wait=0.05)
+    
+    async def run():
+        return await asyncio.gather(*[client.arewrite_with_personality(f"text {i}", "therapist") for i in range(3)])
+    
+    assert asyncio.run(run()) == [f"Rewritten: Rewrite this: text {i}" for i in range(3)]
+    assert len(fake_openai.requests) == 4
+
+
+def test_batched_rewrites_are_cached_per_batch(fake_openai, tmp_path):
+    from backend.app.cache import DiskCache
+    cache = DiskCache(str(tmp_path / "llm_cache.db"))
+    client = LLMClient(api_key="test-key", base_url=fake_openai.base_url, cache=cache, batch_size=8, batch_wait=0.05)
+    
+    async def run():
+        return await asyncio.gather(*[client.arewrite_with_personality(f"text {i}", "calm_mentor") for i in range(3)])
+    
+    assert asyncio.run(run()) == [f"Rewritten: Rewrite this: text {i}" for i in range(3)]
+    assert asyncio.run(run()) == [f"Rewritten: Rewrite this: text {i}" for i in range(3)]
+    assert len(fake_openai.requests) == 1
+    
+    # A single-text request is a different prompt and isn't served from the batch.
+    assert client.rewrite_with_personality("text 1", "calm_mentor") == "Rewritten: Rewrite this: text 1"
+    assert len(fake_openai.requests) == 2
+    assert "response_format" not in fake_openai.requests[1]
+
+
+def test_malformed_batch_reply_is_not_cached(fake_openai, tmp_path, monkeypatch):
+    from backend.app.cache import DiskCache
+    from tests.conftest import FakeOpenAIHandler
+    monkeypatch.setattr(FakeOpenAIHandler, "batch_texts", staticmethod(lambda body: None))
+    cache = DiskCache(str(tmp_path / "llm_cache.db"))
+    client = LLMClient(api_key="test-key", base_url=fake_openai.base_url, cache=cache, batch_size=8, batch_wait=0.05)
+    
+    async def run():
+        return await asyncio.gather(*[client.arewrite_with_personality(f"text {i}", "therapist") for i in range(3)])
+    
+    assert asyncio.run(run()) == [f"Rewritten: Rewrite this: text {i}" for i in range(3)]
+    # Only the three single-text fallbacks were cached.
+    assert len(cache) == 3
+
+
+def test_batch_wait_accepts_fractional_milliseconds(monkeypatch):
+    monkeypatch.setenv("LLM_BATCH_WAIT_MS", "2.5")
+    client = LLMClient(api_key="test-key")
+    assert client.batch_wait == 0.0025
+
+
+def test_stream_rewrite_yields_pieces_and_caches_the_result(fake_openai, tmp_path):
+    from backend.app.cache import DiskCache
+    client = LLMClient(api_key="test-key", base_url=fake_openai.base_url, cache=DiskCache(str(tmp_path / "llm_cache.db")))
+    
+    async def run():
+        pieces = [piece async for piece in client.astream_rewrite("Take a break", "calm_mentor")]
+        cached = [piece async for piece in client.astream_rewrite("Take a break", "calm_mentor")]
+        single = await client.arewrite_with_personality("Take a break", "calm_mentor")
+        await client.aclose()
+        return pieces, cached, single
+    
+    pieces, cached, single = asyncio.run(run())
+    assert pieces == ["Rewritten: ", "Rewrite ", "this: ", "Take ", "a ", "break"]
+    assert cached == [single] == ["Rewritten: Rewrite this: Take a break"]
+    assert len(fake_openai.requests) == 1
+
+
+def test_broken_stream_raises_no_llm_available(fake_openai):
+    fake_openai.stream_fail_after = 1
+    client = LLMClient(api_key="test-key", base_url=fake_openai.base_url)
+    pieces = []
+    
+    async def run():
+        async for piece in client.astream_rewrite("Take a break", "therapist"):
+            pieces.append(piece)
+    
+    with pytest.raises(NoLLMAvailable):
+        asyncio.run(run())
+    assert pieces == ["Rewritten: "]
+
+
+def labelled_lines(body):
+    prompt = body["messages"][1]["content"]
+    return re.findall(r"^\[(\d+)\] user: (.*)$", prompt, re.MULTILINE)
+
+
+def diet_extraction(body):
+    # Reports "vegetarian" for every line that mentions it, like a model would.
+    sources = [int(index) for index, content in labelled_lines(body) if "vegetarian" in content]
+    preferences = [{"category": "food", "value": "vegetarian", "confidence": 0.6, "source_messages": sources}]
+    return {"preferences": preferences if sources else [], "emotional_patterns": [], "facts": []}
+
+
+@pytest.fixture
+def long_history():
+    messages = []
+    for index in range(12):
+        role = "assistant" if index % 3 == 2 else "user"
+        content = "I'm vegetarian" if index in (0, 7) else f"Message number {index} " + "word " * 20
+        messages.append({"index": index, "role": role, "content": content})
+    return messages
+
+
+def test_chunk_messages_respects_budget_and_keeps_indices(long_history):
+    chunks = chunk_messages(long_history, max_tokens=60)
+    assert len(chunks) > 1
+    flattened = [msg["index"] for chunk in chunks for msg in chunk]
+    assert flattened == [msg["index"] for msg in long_history if msg["role"] == "user"]
+    for chunk in chunks:
+        assert len(chunk) == 1 or sum(estimate_tokens(message_line(msg)) for msg in chunk) <= 60
+
+
+def test_chunk_messages_gives_oversized_message_its_own_chunk():
+    messages = [
+        {"index": 0, "role": "user", "content": "short"},
+        {"index": 1, "role": "user", "content": "long " * 500},
+        {"index": 2, "role": "user", "content": "short"}
+    ]
+    assert [[msg["index"] for msg in chunk] for chunk in chunk_messages(messages, 50)] == [[0], [1], [2]]
+
+
+def test_chunked_extraction_merges_windows(fake_openai, long_history):
+    fake_openai.extraction = diet_extraction
+    client = LLMClient(api_key="test-key", base_url=fake_openai.base_url, chunk_tokens=60, parallelism=3)
+    
+    async def run():
+        memory = await client.aextract_memories(long_history, user_id="dana")
+        await client.aclose()
+        return memory
+    
+    memory = asyncio.run(run())
+    assert len(fake_openai.requests) == len(chunk_messages(long_history, 60))
+    labelled = sorted(int(index) for body in fake_openai.requests for index, _ in labelled_lines(body))
+    assert labelled == [msg["index"] for msg in long_history if msg["role"] == "user"]
+    
+    assert memory["user_id"] == "dana"
+    assert len(memory["preferences"]) == 1
+    assert memory["preferences"][0]["source_messages"] == [0, 7]
+    assert memory["preferences"][0]["confidence"] > 0.6
+    
+    sync_memory = LLMClient(api_key="test-key", base_url=fake_openai.base_url, chunk_tokens=60).extract_memories(long_history)
+    assert sync_memory["preferences"] == memory["preferences"]
+
+
+def test_short_history_is_sent_as_one_request(fake_openai, sample_messages):
+    client = LLMClient(api_key="test-key", base_url=fake_openai.base_url)
+    client.extract_memories(sample_messages)
+    assert len(fake_openai.requests) == 1
+
+
+@pytest.mark.parametrize("parallelism", [8, 2])
+def test_chunked_extraction_runs_parallelism_requests_at_once(fake_openai, parallelism):
+    fake_openai.delay = 0.2
+    messages = [{"index": index, "role": "user", "content": "word " * 40} for index in range(8)]
+    client = LLMClient(api_key="test-key", base_url=fake_openai.base_url, chunk_tokens=60, parallelism=parallelism)
+    
+    async def run():
+        await client.aextract_memories(messages)
+        await client.aclose()
+    
+    asyncio.run(run())
+    assert len(chunk_messages(messages, 60)) == 8
+    assert len(fake_openai.requests) == 8
+    assert fake_openai.max_in_flight == parallelism
@@ -1,3 +1,6 @@
+import asyncio
+import json
+import random
 from fastapi.testclient import TestClient
 from main import app
 import pytest
@@ -122,4 +125,563 @@ def test_rewrite_with_llm_fallback(client):
     response = client.post("/rewrite", json=payload)
     assert response.status_code == 200
     data = response.json()
-    assert data["method"] in ["llm", "deterministic"]
\ No newline at end of file
+    assert data["method"] in ["llm", "deterministic"]
+
+def test_health_reports_entity_cache_stats(client):
+    data = client.get("/health").json()
+    stats = data["caches"]["entities"]
+    for key in ["size", "max_entries", "hits", "misses", "evictions", "hit_rate"]:
+        assert key in stats
+
+
+@pytest.fixture
+def isolated_state(monkeypatch, tmp_path):
+    import main
+    from backend.app.events import EventLog
+    from backend.app.state import ExtractionStateStore
+    from backend.app.store import MemoryStore
+    path = str(tmp_path / "memory.db")
+    monkeypatch.setattr(main, "state_store", ExtractionStateStore(str(tmp_path / "state")))
+    monkeypatch.setattr(main, "memory_store", MemoryStore(path))
+    monkeypatch.setattr(main, "event_log", EventLog(path))
+
+
+def test_extract_incremental_only_processes_new_messages(client, isolated_state):
+    first = client.post("/extract/incremental", json={
+        "user_id": "alice",
+        "messages": [{"index": 0, "role": "user", "content": "I'm vegetarian"}]
+    }).json()
+    assert first["processed_messages"] == 1
+    assert first["last_index"] == 0
+    
+    second = client.post("/extract/incremental", json={
+        "user_id": "alice",
+        "messages": [
+            {"index": 0, "role": "user", "content": "I'm vegetarian"},
+            {"index": 1, "role": "user", "content": "I live in Berlin"}
+        ]
+    }).json()
+    assert second["processed_messages"] == 1
+    assert second["last_index"] == 1
+    assert second["memory"]["user_id"] == "alice"
+    assert len(second["memory"]["preferences"]) == 1
+
+
+def test_extract_incremental_reset_starts_over(client, isolated_state):
+    payload = {
+        "user_id": "bob",
+        "messages": [{"index": 0, "role": "user", "content": "I'm vegetarian"}]
+    }
+    client.post("/extract/incremental", json=payload)
+    
+    data = client.post("/extract/incremental", json={**payload, "reset": True}).json()
+    assert data["processed_messages"] == 1
+    assert len(data["memory"]["preferences"]) == 1
+
+
+def test_extract_batch_streams_one_memory_per_conversation(client, monkeypatch):
+    import json
+    import main
+    from backend.app.batch import BatchExtractor
+    monkeypatch.setattr(main, "batch_extractor", BatchExtractor(workers=0, extractor=main.extractor))
+    
+    payload = {
+        "conversations": [
+            {"user_id": "alice", "messages": [{"index": 0, "role": "user", "content": "I'm vegetarian"}]},
+            {"user_id": "bob", "messages": [{"index": 0, "role": "user", "content": "I live in Berlin"}]}
+        ]
+    }
+    response = client.post("/extract/batch", json=payload)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(result["user_id"] for result in results) == ["alice", "bob"]
+    assert all(result["success"] for result in results)
+
+
+def test_ready_reflects_extractor_loading(client, monkeypatch):
+    import main
+    from backend.app.extraction import Extractor
+    monkeypatch.setattr(main, "extractor", Extractor())
+    
+    assert client.get("/health").json()["ready"] is False
+    assert client.get("/ready").status_code == 503
+    
+    main.extractor.warm_up()
+    assert client.get("/health").json()["ready"] is True
+    assert client.get("/ready").status_code == 200
+
+
+def test_gunicorn_config_loads_model_before_fork(monkeypatch):
+    import gc
+    import logging
+    import runpy
+    import main
+    from pathlib import Path
+    from backend.app.extraction import Extractor
+    monkeypatch.setattr(main, "extractor", Extractor())
+    monkeypatch.setattr(gc, "freeze", lambda: None)
+    
+    config = runpy.run_path(str(Path(__file__).parent.parent / "gunicorn.conf.py"))
+    assert config["preload_app"] is True
+    
+    class Server:
+        log = logging.getLogger("gunicorn.test")
+    
+    config["when_ready"](Server())
+    assert main.extractor.is_ready()
+
+
+@pytest.fixture
+def isolated_store(monkeypatch, tmp_path):
+    import main
+    from backend.app.events import EventLog
+    from backend.app.store import MemoryStore
+    path = str(tmp_path / "memory.db")
+    monkeypatch.setattr(main, "memory_store", MemoryStore(path))
+    monkeypatch.setattr(main, "event_log", EventLog(path))
+
+
+def test_generate_response_loads_stored_memory(client, isolated_store):
+    client.post("/extract", json={
+        "user_id": "alice",
+        "messages": [{"index": 0, "role": "user", "content": "I'm vegetarian"}]
+    })
+    
+    response = client.post("/generate-response", json={
+        "user_id": "alice",
+        "user_message": "What should I eat?",
+        "personality": "calm_mentor"
+    })
+    assert response.status_code == 200
+    assert "vegetarian" in response.json()["base_response"]
+
+
+def test_generate_response_reuses_memory_index_until_memory_changes(client, isolated_store):
+    import main
+    main.personality_engine.index_cache.clear()
+    payload = {"user_id": "bob", "user_message": "What should I eat?", "personality": "calm_mentor"}
+    client.post("/extract", json={"user_id": "bob", "messages": [{"index": 0, "role": "user", "content": "I'm vegetarian"}]})
+    client.post("/generate-response", json=payload)
+    client.post("/generate-response", json=payload)
+    assert client.get("/health").json()["caches"]["memory_indexes"]["size"] == 1
+
+    client.post("/extract", json={"user_id": "bob", "messages": [{"index": 1, "role": "user", "content": "I live in Berlin"}]})
+    payload["user_message"] = "Any ideas for the weekend?"
+    assert "Berlin" in client.post("/generate-response", json=payload).json()["base_response"]
+    assert client.get("/health").json()["caches"]["memory_indexes"]["size"] == 2
+
+
+def test_generate_response_requires_memory_or_user_id(client, isolated_store):
+    payload = {"user_message": "What should I eat?", "personality": "calm_mentor"}
+    assert client.post("/generate-response", json=payload).status_code == 400
+    assert client.post("/generate-response", json={**payload, "user_id": "ghost"}).status_code == 404
+
+
+def test_get_memory_filters_by_category(client, isolated_store):
+    client.post("/extract", json={
+        "user_id": "bob",
+        "messages": [
+            {"index": 0, "role": "user", "content": "I'm vegetarian"},
+            {"index": 1, "role": "user", "content": "I use linux"}
+        ]
+    })
+    
+    data = client.get("/memory/bob", params={"category": "technology"}).json()
+    assert [p["value"] for p in data["memory"]["preferences"]] == ["linux"]
+    assert client.get("/memory/ghost").status_code == 404
+
+
+def test_extract_with_user_id_merges_into_stored_memory(client, isolated_store):
+    client.post("/extract", json={
+        "user_id": "carol",
+        "messages": [{"index": 0, "role": "user", "content": "I'm vegetarian"}]
+    })
+    data = client.post("/extract", json={
+        "user_id": "carol",
+        "messages": [
+            {"index": 0, "role": "user", "content": "I use linux"},
+            {"index": 1, "role": "user", "content": "Still vegetarian"}
+        ]
+    }).json()
+    
+    values = {p["value"]: p for p in data["memory"]["preferences"]}
+    assert set(values) == {"vegetarian", "linux"}
+    assert values["vegetarian"]["source_messages"] == [0, 1]
+
+
+def test_concurrent_extracts_for_one_user_all_merge(isolated_store):
+    import httpx
+    import main
+    
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            await asyncio.gather(*[
+                http.post("/extract", json={
+                    "user_id": "alice",
+                    "messages": [{"index": i, "role": "user", "content": "I'm vegetarian"}]
+                })
+                for i in range(40)
+            ])
+    
+    asyncio.run(run())
+    stored = main.memory_store.load("alice")
+    assert stored["preferences"][0]["source_messages"] == list(range(40))
+
+
+def test_extract_and_incremental_extract_merge_into_one_memory(client, isolated_state, isolated_store):
+    import main
+    client.post("/extract", json={
+        "user_id": "bob",
+        "messages": [{"index": 0, "role": "user", "content": "I'm vegetarian"}]
+    })
+    data = client.post("/extract/incremental", json={
+        "user_id": "bob",
+        "messages": [{"index": 1, "role": "user", "content": "I love coffee"}]
+    }).json()
+    
+    values = {pref["value"] for pref in data["memory"]["preferences"]}
+    assert values == {"vegetarian", "coffee lover"}
+    assert {pref["value"] for pref in main.memory_store.load("bob")["preferences"]} == values
+
+
+def test_event_log_follows_every_store_write(client, isolated_state, isolated_store):
+    import main
+    client.post("/extract", json={"user_id": "bob", "messages": [{"index": 0, "role": "user", "content": "I'm vegetarian"}]})
+    client.post("/extract/incremental", json={"user_id": "bob", "messages": [{"index": 1, "role": "user", "content": "I love coffee"}]})
+    client.post("/extract", json={"user_id": "bob", "messages": [{"index": 2, "role": "user", "content": "More coffee please, I love coffee"}]})
+    
+    stored = main.memory_store.load("bob")
+    rebuilt = main.event_log.rebuild("bob")
+    for field in ["preferences", "emotional_patterns", "facts", "raw_extractions"]:
+        assert rebuilt[field] == stored[field]
+
+
+def test_extract_with_user_id_logs_memory_events(client, isolated_store):
+    import main
+    for index, content in enumerate(["I'm vegetarian", "I use linux", "Still vegetarian"]):
+        data = client.post("/extract", json={
+            "user_id": "dave",
+            "messages": [{"index": index, "role": "user", "content": content}]
+        }).json()
+    
+    rebuilt = main.event_log.rebuild("dave")
+    assert rebuilt == data["memory"]
+
+
+def test_generate_response_batch(client):
+    memory = {
+        "preferences": [{"category": "food", "value": "vegetarian", "confidence": 0.95}],
+        "emotional_patterns": [],
+        "facts": [{"fact_type": "location", "value": "Berlin", "confidence": 0.9}]
+    }
+    prompts = [
+        {"user_message": "What should I eat?", "personality": "calm_mentor"},
+        {"user_message": "Any weekend ideas?", "personality": "witty_friend"},
+        {"user_message": "How do I learn Rust?", "personality": "therapist"}
+    ]
+    response = client.post("/generate-response/batch", json={"memory": memory, "prompts": prompts})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["method"] == "deterministic"
+    assert [item["user_message"] for item in data["responses"]] == [p["user_message"] for p in prompts]
+    assert [item["personality"] for item in data["responses"]] == [p["personality"] for p in prompts]
+    assert data["responses"][0]["base_response"].startswith("Since you're vegetarian, ")
+    assert data["responses"][1]["base_response"].startswith("Being in Berlin, ")
+    for item in data["responses"]:
+        assert item["personalized_response"] != item["base_response"]
+
+
+def test_generate_response_batch_rejects_unknown_personality(client):
+    payload = {
+        "memory": {"preferences": [], "emotional_patterns": [], "facts": []},
+        "prompts": [
+            {"user_message": "Hi", "personality": "calm_mentor"},
+            {"user_message": "Hi", "personality": "pirate"}
+        ]
+    }
+    response = client.post("/generate-response/batch", json=payload)
+    assert response.status_code == 400
+    assert "pirate" in response.json()["detail"]
+
+
+def test_generate_response_batch_loads_stored_memory(client, isolated_store):
+    client.post("/extract", json={
+        "user_id": "carol",
+        "messages": [{"index": 0, "role": "user", "content": "I'm vegetarian"}]
+    })
+    response = client.post("/generate-response/batch", json={
+        "user_id": "carol",
+        "prompts": [{"user_message": "What should I eat?", "personality": "calm_mentor"}] * 3
+    })
+    assert response.status_code == 200
+    assert all("vegetarian" in item["base_response"] for item in response.json()["responses"])
+    assert client.post("/generate-response/batch", json={"user_id": "ghost", "prompts": []}).status_code == 404
+
+
+def test_rewrite_with_seed_is_deterministic(client):
+    payload = {"text": "Take a short walk", "personality": "witty_friend", "seed": 7}
+    outputs = {client.post("/rewrite", json=payload).json()["rewritten"] for _ in range(5)}
+    assert len(outputs) == 1
+
+
+def test_seeded_generate_response_is_cached(client):
+    import main
+    main.response_cache.clear()
+    before = main.response_cache.stats()
+    payload = {
+        "memory": {"preferences": [{"category": "food", "value": "vegan", "confidence": 0.9}], "emotional_patterns": [], "facts": []},
+        "user_message": "What should I eat?",
+        "personality": "therapist",
+        "seed": 3
+    }
+    first = client.post("/generate-response", json=payload).json()
+    second = client.post("/generate-response", json=payload).json()
+    assert first == second
+    
+    stats = client.get("/health").json()["caches"]["responses"]
+    assert stats["hits"] - before["hits"] == 1
+    assert stats["size"] == 1
+    
+    client.post("/generate-response", json={**payload, "seed": 4})
+    client.post("/generate-response", json={**payload, "seed": None})
+    assert client.get("/health").json()["caches"]["responses"]["size"] == 2
+
+
+def test_rewrite_batch(client):
+    texts = ["Take a short walk", "You should consider a nap", "Drink some water"]
+    response = client.post("/rewrite/batch", json={"texts": texts, "personality": "calm_mentor"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["method"] == "deterministic"
+    assert len(data["rewritten"]) == 3
+    for text, rewritten in zip(texts, data["rewritten"]):
+        assert text in rewritten
+
+
+def test_rewrite_batch_with_seed_matches_single_rewrites(client):
+    texts = ["Take a short walk", "you should consider a nap"]
+    batch = client.post("/rewrite/batch", json={"texts": texts, "personality": "witty_friend", "seed": 11}).json()
+    singles = [
+        client.post("/rewrite", json={"text": text, "personality": "witty_friend", "seed": 11}).json()["rewritten"]
+        for text in texts
+    ]
+    assert batch["rewritten"] == singles
+
+
+def test_rewrite_batch_rejects_unknown_personality(client):
+    response = client.post("/rewrite/batch", json={"texts": ["Hi"], "personality": "pirate"})
+    assert response.status_code == 400
+
+
+@pytest.fixture
+def fake_llm(monkeypatch, fake_openai):
+    import main
+    from backend.app.llm_client import LLMClient
+    client = LLMClient(api_key="test-key", base_url=fake_openai.base_url, max_connections=500)
+    monkeypatch.setattr(main, "llm_client", client)
+    return fake_openai
+
+
+def test_rewrite_with_llm_uses_async_client(client, fake_llm):
+    response = client.post("/rewrite", json={"text": "Take a break", "personality": "calm_mentor", "use_llm": True})
+    data = response.json()
+    assert data["method"] == "llm"
+    assert data["rewritten"] == "Rewritten: Rewrite this: Take a break"
+
+
+def test_extract_with_llm_uses_async_client(client, fake_llm):
+    response = client.post("/extract", json={
+        "messages": [{"index": 0, "role": "user", "content": "I'm vegetarian"}],
+        "use_llm": True
+    })
+    data = response.json()
+    assert data["method"] == "llm"
+    assert data["memory"]["preferences"][0]["value"] == "vegetarian"
+
+
+def test_extract_with_malformed_llm_output_for_a_user_is_rejected(client, fake_llm, isolated_state):
+    import main
+    fake_llm.extraction = {"preferences": ["vegetarian"], "emotional_patterns": [], "facts": None,
+                           "confidence": "high"}
+    response = client.post("/extract", json={
+        "messages": [{"index": 0, "role": "user", "content": "I'm vegetarian"}],
+        "use_llm": True,
+        "user_id": "alice"
+    })
+    assert response.status_code == 422
+    assert "Memory validation failed" in response.json()["detail"]
+    assert main.memory_store.load("alice") is None
+    assert main.event_log.rebuild("alice") is None
+
+
+def test_extract_hybrid_escalates_only_unresolved_messages(client, fake_llm):
+    fake_llm.extraction = {
+        "preferences": [{"category": "food", "value": "eats meat again", "confidence": 0.8, "source_messages": [1]}],
+        "emotional_patterns": [],
+        "facts": []
+    }
+    response = client.post("/extract", json={
+        "messages": [
+            {"index": 0, "role": "user", "content": "I'm vegetarian and I live in Berlin"},
+            {"index": 1, "role": "user", "content": "I'm not vegetarian anymore"},
+            {"index": 2, "role": "user", "content": "I prefer async communication"},
+            {"index": 3, "role": "user", "content": "Thanks, that helps a lot"}
+        ],
+        "hybrid": True
+    })
+    data = response.json()
+    assert data["method"] == "hybrid"
+    assert data["escalation"] == {"messages": 4, "escalated": 2, "ambiguous": 1, "unresolved": 1, "fraction": 0.5}
+    
+    assert len(fake_llm.requests) == 1
+    prompt = fake_llm.requests[0]["messages"][-1]["content"]
+    assert "[1] user: I'm not vegetarian anymore" in prompt
+    assert "[3] user: Thanks, that helps a lot" in prompt
+    assert "[0]" not in prompt and "[2]" not in prompt
+    
+    values = {pref["value"]: pref["source_messages"] for pref in data["memory"]["preferences"]}
+    assert values["vegetarian"] == [0]
+    assert values["eats meat again"] == [1]
+
+
+def test_extract_hybrid_falls_back_when_llm_output_is_malformed(client, fake_llm, isolated_state):
+    fake_llm.extraction = {"preferences": ["eats meat again"], "emotional_patterns": [], "facts": None}
+    response = client.post("/extract", json={
+        "messages": [
+            {"index": 0, "role": "user", "content": "I live in Berlin"},
+            {"index": 1, "role": "user", "content": "I'm not vegetarian anymore"}
+        ],
+        "hybrid": True,
+        "user_id": "alice"
+    })
+    assert response.status_code == 200
+    data = response.json()
+    assert data["escalation"]["escalated"] == 1
+    assert len(fake_llm.requests) == 1
+    assert {fact["value"] for fact in data["memory"]["facts"]} >= {"Berlin"}
+    assert [pref["value"] for pref in data["memory"]["preferences"]] == ["vegetarian"]
+
+
+def test_extract_hybrid_skips_llm_when_everything_resolves(client, fake_llm):
+    response = client.post("/extract", json={
+        "messages": [{"index": 0, "role": "user", "content": "I'm vegetarian"}],
+        "hybrid": True
+    })
+    data = response.json()
+    assert data["escalation"]["escalated"] == 0
+    assert data["escalation"]["fraction"] == 0.0
+    assert fake_llm.requests == []
+
+
+def test_rewrite_batch_with_llm_runs_calls_concurrently(client, fake_llm):
+    fake_llm.delay = 0.2
+    texts = [f"text {i}" for i in range(40)]
+    data = client.post("/rewrite/batch", json={"texts": texts, "personality": "therapist", "use_llm": True}).json()
+    assert data["rewritten"] == [f"Rewritten: Rewrite this: {text}" for text in texts]
+    assert len(fake_llm.requests) > 1
+    assert fake_llm.max_in_flight == len(fake_llm.requests)
+
+
+def test_concurrent_llm_requests_do_not_wait_for_threadpool(fake_llm, monkeypatch):
+    import httpx
+    import main
+    from backend.app.llm_client import LLMClient
+    # One request per rewrite, so every call has to be in flight on its own.
+    monkeypatch.setattr(main, "llm_client", LLMClient(
+        api_key="test-key", base_url=fake_llm.base_url, max_connections=500, batch_size=1
+    ))
+    
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            await http.post("/rewrite", json={"text": "warm up", "personality": "calm_mentor", "use_llm": True})
+            fake_llm.delay = 1.0
+            return await asyncio.gather(*[
+                http.post("/rewrite", json={"text": f"t{i}", "personality": "calm_mentor", "use_llm": True})
+                for i in range(120)
+            ])
+    
+    responses = asyncio.run(run())
+    assert all(response.json()["method"] == "llm" for response in responses)
+    # Blocking calls would be capped by the threadpool's 40 threads.
+    assert fake_llm.max_in_flight > 40
+
+
+def test_health_reports_llm_cache_stats(client):
+    stats = client.get("/health").json()["caches"]["llm"]
+    for key in ["size", "max_entries", "ttl", "hits", "misses", "evictions", "hit_rate"]:
+        assert key in stats
+
+
+def sse_events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_rewrite_stream_deterministic(client):
+    payload = {"text": "You should take a break", "personality": "witty_friend", "seed": 3}
+    response = client.post("/rewrite/stream", json=payload)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    
+    events = sse_events(response.text)
+    assert [name for name, _ in events] == ["meta", "token", "done"]
+    assert events[0][1] == {"original": payload["text"], "personality": "witty_friend", "method": "deterministic"}
+    assert events[2][1]["text"] == client.post("/rewrite", json=payload).json()["rewritten"]
+
+
+def test_rewrite_stream_rejects_unknown_personality(client):
+    response = client.post("/rewrite/stream", json={"text": "Hi", "personality": "pirate"})
+    assert response.status_code == 400
+
+
+def test_rewrite_stream_forwards_llm_tokens(client, fake_llm):
+    response = client.post("/rewrite/stream", json={"text": "Take a break", "personality": "calm_mentor", "use_llm": True})
+    events = sse_events(response.text)
+    tokens = [data["text"] for name, data in events if name == "token"]
+    assert events[0][1]["method"] == "llm"
+    assert len(tokens) == 6
+    assert "".join(tokens) == "Rewritten: Rewrite this: Take a break"
+    assert events[-1] == ("done", {"text": "Rewritten: Rewrite this: Take a break", "method": "llm"})
+    assert fake_llm.requests[0]["stream"] is True
+
+
+def test_rewrite_stream_falls_back_when_llm_stream_breaks(client, fake_llm):
+    import main
+    fake_llm.stream_fail_after = 2
+    payload = {"text": "Take a break", "personality": "therapist", "use_llm": True, "seed": 5}
+    events = sse_events(client.post("/rewrite/stream", json=payload).text)
+    
+    expected = main.personality_engine.rewrite("Take a break", "therapist", random.Random(5))
+    assert [name for name, _ in events] == ["meta", "token", "token", "fallback", "done"]
+    assert events[3][1] == {"text": expected}
+    assert events[4][1] == {"text": expected, "method": "deterministic"}
+
+
+def test_generate_response_stream(client, fake_llm):
+    memory = {
+        "preferences": [{"category": "food", "value": "vegetarian", "confidence": 0.95}],
+        "emotional_patterns": [],
+        "facts": []
+    }
+    response = client.post("/generate-response/stream", json={
+        "memory": memory,
+        "user_message": "What should I eat?",
+        "personality": "witty_friend",
+        "use_llm": True
+    })
+    events = sse_events(response.text)
+    base_response = events[0][1]["base_response"]
+    assert base_response.startswith("Since you're vegetarian, ")
+    assert events[-1] == ("done", {"text": f"Rewritten: Rewrite this: {base_response}", "method": "llm"})
+
+
+def test_generate_response_stream_requires_memory_or_user_id(client):
+    response = client.post("/generate-response/stream", json={"user_message": "Hi", "personality": "therapist"})
+    assert response.status_code == 400
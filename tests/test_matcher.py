@@ -0,0 +1,128 @@
+import json
+import re
+import pytest
+from pathlib import Path
+from backend.app.matcher import MultiPatternMatcher, literal_prefixes, trie_regex
+from backend.app.extraction import Extractor
+
+
+@pytest.fixture
+def extractor():
+    return Extractor()
+
+
+def naive_scan(extractor, text):
+    found = {}
+    for name, pattern in extractor.patterns.items():
+        match = pattern.search(text)
+        if match:
+            found[("preference", name)] = match
+    for name, pattern in extractor.emotional_keywords.items():
+        match = pattern.search(text)
+        if match:
+            found[("emotion", name)] = match
+    return found
+
+
+def summarize(found):
+    return {key: (match.span(), match.groups()) for key, match in found.items()}
+
+
+def test_every_pattern_has_triggers(extractor):
+    assert set(extractor.pattern_triggers) == set(extractor.patterns)
+    assert set(extractor.emotion_triggers) == set(extractor.emotional_keywords)
+    for triggers in list(extractor.pattern_triggers.values()) + list(extractor.emotion_triggers.values()):
+        assert triggers
+
+
+@pytest.mark.parametrize("pattern, expected", [
+    (r"\b(lo-?fi|lofi)\b", ["lo", "lofi"]),
+    (r"\bgreen tea\b", ["green tea"]),
+    (r"\bdirect\s+communication\b", ["direct"]),
+    (r"\b(Hate|dislike)(?:x|y)", ["dislike", "hate"]),
+    (r"\b(cat|dog)\b(?:\s+(\w+))?", ["cat", "dog"]),
+    (r"\bprefer.{0,80}(text|async)\b", ["prefer"]),
+    (r"work", []),
+    (r"\b(?:a|\d+)", []),
+    (r"\b-x", []),
+])
+def test_literal_prefixes(pattern, expected):
+    assert literal_prefixes(re.compile(pattern, re.IGNORECASE)) == expected
+
+
+def test_every_pattern_match_starts_with_a_trigger(extractor):
+    samples = [
+        "I'm vegan, plant-based really", "lofi or lo-fi", "green tea", "asynchronous please",
+        "I dislike every standup", "struggling with meetings", "linux", "allergic to peanuts",
+        "keep it brief: short message", "working late at night", "my dog Rex", "I prefer writing",
+        "direct communication", "early bird", "introverted", "love socializing", "wfh",
+        "need coffee", "tea person", "workout", "bookworm", "so overwhelmed", "grateful",
+        "I overthink", "looking forward", "burned out", "joyful", "uncertain",
+    ]
+    rules = [(extractor.patterns, extractor.pattern_triggers),
+             (extractor.emotional_keywords, extractor.emotion_triggers)]
+    matched = set()
+    for patterns, triggers in rules:
+        for name, pattern in patterns.items():
+            for sample in samples:
+                for match in pattern.finditer(sample):
+                    matched.add(name)
+                    assert match.group(0).lower().startswith(tuple(triggers[name]))
+    assert matched == set(extractor.patterns) | set(extractor.emotional_keywords)
+
+
+def test_scan_matches_per_pattern_search_on_sample_messages(extractor):
+    messages_path = Path(__file__).parent.parent / "examples" / "30_messages.json"
+    with open(messages_path, "r") as f:
+        messages = json.load(f)
+
+    for msg in messages:
+        assert summarize(extractor.matcher.scan(msg["content"])) == summarize(naive_scan(extractor, msg["content"]))
+
+
+@pytest.mark.parametrize("text", [
+    "I HATE standups and morning Meetings",
+    "Into LOFI and lo-fi beats, also lo fi",
+    "My dog Rex and my cat",
+    "catalog networking homework",
+    "I'm allergic to shellfish and allergic to cats",
+    "prefer alone time, prefer tea, prefer writing",
+    "plant-based wfh bookworm who is burned out",
+    "",
+])
+def test_scan_matches_per_pattern_search(extractor, text):
+    assert summarize(extractor.matcher.scan(text)) == summarize(naive_scan(extractor, text))
+
+
+def test_scan_returns_leftmost_match_for_captures(extractor):
+    hits = extractor.matcher.scan("my dog Rex and my cat Luna")
+    assert hits[("preference", "pet")].groups() == ("dog", "Rex")
+
+
+def test_rules_without_triggers_are_always_searched():
+    matcher = MultiPatternMatcher([
+        ("digits", re.compile(r"\d+"), []),
+        ("word", re.compile(r"\bhello\b", re.IGNORECASE), ["hello"]),
+    ])
+
+    hits = matcher.scan("say Hello 42")
+    assert hits["digits"].group(0) == "42"
+    assert hits["word"].group(0) == "Hello"
+
+
+def test_shorter_triggers_are_implied_by_longer_hits():
+    matcher = MultiPatternMatcher([
+        ("short", re.compile(r"\bwork", re.IGNORECASE), ["work"]),
+        ("long", re.compile(r"\bworking\b", re.IGNORECASE), ["working"]),
+    ])
+
+    assert set(matcher.scan("working hard")) == {"short", "long"}
+
+
+def test_trie_regex_matches_exactly_the_words():
+    words = ["cat", "cats", "car", "dog", "free time"]
+    pattern = re.compile(r"(?:" + trie_regex(words) + r")\Z")
+    for word in words:
+        assert pattern.match(word)
+    for other in ["ca", "cart", "do", "free", ""]:
+        assert not pattern.match(other)
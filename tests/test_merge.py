@@ -0,0 +1,73 @@
+import pytest
+from backend.app.merge import MemoryMerger
+from backend.app.validators import validate_memory
+
+
+def make_memory(preferences=(), emotions=(), facts=()):
+    return {
+        "user_id": "alice",
+        "generated_at": "2026-01-01T00:00:00Z",
+        "preferences": [
+            {"category": c, "value": v, "confidence": conf, "source_messages": list(src)}
+            for c, v, conf, src in preferences
+        ],
+        "emotional_patterns": [
+            {"pattern": p, "confidence": conf, "source_messages": list(src)} for p, conf, src in emotions
+        ],
+        "facts": [
+            {"fact_type": t, "value": v, "confidence": conf, "source_messages": list(src)}
+            for t, v, conf, src in facts
+        ],
+        "raw_extractions": []
+    }
+
+
+def test_merge_unions_sources_and_aggregates_confidence():
+    base = make_memory(preferences=[("food", "vegetarian", 0.8, [2])])
+    update = make_memory(preferences=[("food", "Vegetarian", 0.5, [9, 2])])
+    
+    merged = MemoryMerger().merge(base, update)
+    
+    assert len(merged["preferences"]) == 1
+    pref = merged["preferences"][0]
+    assert pref["source_messages"] == [2, 9]
+    assert pref["confidence"] == pytest.approx(0.9)
+    validate_memory(merged)
+
+
+def test_merge_without_new_evidence_does_not_inflate_confidence():
+    memory = make_memory(emotions=[("stress", 0.8, [3])])
+    merger = MemoryMerger()
+    
+    merged = merger.merge(merger.merge(memory, memory), memory)
+    assert merged["emotional_patterns"][0]["confidence"] == 0.8
+
+
+def test_compact_deduplicates_within_one_memory():
+    memory = make_memory(facts=[("location", "Berlin", 0.88, [3]), ("location", "berlin", 0.88, [12])])
+    
+    compacted = MemoryMerger().compact(memory)
+    assert len(compacted["facts"]) == 1
+    assert compacted["facts"][0]["source_messages"] == [3, 12]
+
+
+def test_caps_evict_low_confidence_then_stale_items():
+    memory = make_memory(preferences=[
+        ("food", "old and weak", 0.5, [1]),
+        ("food", "strong", 0.95, [2]),
+        ("food", "recent and weak", 0.5, [20]),
+        ("food", "middling", 0.7, [3]),
+    ])
+    
+    compacted = MemoryMerger(limits={"preferences": 2}).compact(memory)
+    assert [p["value"] for p in compacted["preferences"]] == ["strong", "middling"]
+    
+    compacted = MemoryMerger(limits={"preferences": 3}).compact(memory)
+    assert [p["value"] for p in compacted["preferences"]] == ["strong", "recent and weak", "middling"]
+
+
+def test_source_messages_are_capped_to_most_recent():
+    memory = make_memory(emotions=[("stress", 0.8, [i]) for i in range(10)])
+    
+    compacted = MemoryMerger(max_sources=3).compact(memory)
+    assert compacted["emotional_patterns"][0]["source_messages"] == [7, 8, 9]
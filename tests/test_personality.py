@@ -1,10 +1,12 @@
+import random
 import pytest
 from backend.app.personality import (
     PersonalityEngine,
     CalmMentorStrategy,
     WittyFriendStrategy,
     TherapistStrategy,
-    RewriteStrategy
+    RewriteStrategy,
+    MemoryIndex
 )
 
 
@@ -180,3 +182,129 @@ def test_generate_memory_aware_response_generic_question(engine):
     response = engine.generate_memory_aware_response(memory, "How do I learn programming?")
     assert len(response) > 0
     assert isinstance(response, str)
+
+
+def test_memory_index_lookups():
+    memory = {
+        "preferences": [
+            {"category": "work_style", "value": "works late"},
+            {"category": "food", "value": "vegetarian"},
+            {"category": "communication", "value": "prefers async"},
+            {"category": "social", "value": "introvert"}
+        ],
+        "emotional_patterns": [{"pattern": "tired"}],
+        "facts": [
+            {"fact_type": "location", "value": "Berlin"},
+            {"fact_type": "health", "value": "Allergic to peanuts"},
+            {"fact_type": "pet", "value": "cat named Luna"}
+        ]
+    }
+    index = MemoryIndex(memory)
+    assert index.preferences("food") == ["vegetarian"]
+    assert index.preferences("missing") == []
+    assert index.facts("location") == ["Berlin"]
+    assert index.tagged("work") == ["works late", "prefers async"]
+    assert index.tagged("social") == ["introvert"]
+    assert index.tagged("allergy") == ["Allergic to peanuts"]
+    assert index.tagged("pet") == ["cat named Luna"]
+    assert index.tagged("location") == ["Berlin"]
+    assert index.has_emotion(["stress", "tired"])
+    assert not index.has_emotion(["stress"])
+
+
+def test_memory_index_is_cached_by_key(engine):
+    memory = {"preferences": [{"category": "food", "value": "vegetarian"}], "emotional_patterns": [], "facts": []}
+    first = engine.generate_memory_aware_response(memory, "What should I eat?", memory_key=("alice", "v1"))
+    second = engine.generate_memory_aware_response(memory, "What should I eat?", memory_key=("alice", "v1"))
+    assert "vegetarian" in first and "vegetarian" in second
+    assert engine.index_cache.stats()["hits"] == 1
+    assert engine.memory_index(memory, ("alice", "v1")) is engine.memory_index(memory, ("alice", "v1"))
+    assert engine.memory_index(memory) is not engine.memory_index(memory)
+
+
+def test_memory_aware_response_skips_malformed_items(engine):
+    memory = {
+        "preferences": ["not a dict", {"category": "food", "value": "vegan"}],
+        "emotional_patterns": ["stress"],
+        "facts": [None, {"fact_type": "health", "value": 3}]
+    }
+    response = engine.generate_memory_aware_response(memory, "What's for dinner?")
+    assert response.startswith("Since you're vegan, ")
+
+
+@pytest.mark.parametrize("message", ["What's for dinner?", "I'm so stressed", "Where should I go?"])
+def test_memory_aware_response_treats_null_lists_as_empty(engine, message):
+    memory = {"preferences": None, "emotional_patterns": None, "facts": None}
+    index = MemoryIndex(memory)
+    assert index.preferences("food") == []
+    assert index.facts("location") == []
+    assert index.tagged("work") == [] and index.tagged("pet") == []
+    assert not index.has_emotion(["stress"])
+    assert engine.generate_memory_aware_response(memory, message)
+
+
+def test_memory_aware_response_ignores_topic_words_inside_other_words(engine):
+    memory = {
+        "preferences": [{"category": "food", "value": "vegetarian"}],
+        "emotional_patterns": [],
+        "facts": [{"fact_type": "location", "value": "Berlin"}]
+    }
+    response = engine.generate_memory_aware_response(memory, "Any tips for a great weekend?")
+    assert response.startswith("Being in Berlin, ")
+
+
+def test_generate_memory_aware_responses_indexes_memory_once(engine, monkeypatch):
+    import backend.app.personality as personality
+    built = []
+    original = personality.MemoryIndex.__init__
+
+    def counting_init(self, memory):
+        built.append(memory)
+        original(self, memory)
+
+    monkeypatch.setattr(personality.MemoryIndex, "__init__", counting_init)
+    memory = {"preferences": [{"category": "food", "value": "vegan"}], "emotional_patterns": [], "facts": []}
+    responses = engine.generate_memory_aware_responses(memory, ["What's for dinner?", "Any food tips?", "Hello"])
+    assert len(responses) == 3
+    assert responses[0].startswith("Since you're vegan, ") and responses[1].startswith("Since you're vegan, ")
+    assert len(built) == 1
+
+
+def test_seeded_generation_is_reproducible(engine):
+    memory = {"preferences": [{"category": "food", "value": "vegan"}], "emotional_patterns": [], "facts": []}
+    for personality in ["calm_mentor", "witty_friend", "therapist"]:
+        outputs = set()
+        for _ in range(5):
+            rng = random.Random(42)
+            base = engine.generate_memory_aware_response(memory, "What's for dinner?", rng=rng)
+            outputs.add(engine.rewrite(base, personality, rng))
+        assert len(outputs) == 1
+
+    seeded = {engine.rewrite("Take a walk", "therapist", random.Random(seed)) for seed in range(50)}
+    assert len(seeded) > 1
+
+
+def test_engine_reuses_strategy_instances(engine):
+    from backend.app.personality import STRATEGIES
+    assert engine.strategies is STRATEGIES
+    assert PersonalityEngine().strategies["therapist"] is engine.strategies["therapist"]
+
+
+def test_witty_friend_substitutions():
+    result = WittyFriendStrategy().rewrite("you should consider it, it is important", random.Random(0))
+    assert "you could totally think about it, it's super important" in result
+
+
+def test_calm_mentor_keeps_braces_in_text():
+    result = CalmMentorStrategy().rewrite("Use {} placeholders and {name} fields")
+    assert "Use {} placeholders and {name} fields" in result
+
+
+def test_rewrite_many(engine):
+    texts = ["Rest well", "Eat well"]
+    assert engine.rewrite_many(texts, "therapist", seed=5) == [
+        engine.rewrite(text, "therapist", random.Random(5)) for text in texts
+    ]
+    assert len(engine.rewrite_many(texts, "calm_mentor")) == 2
+    with pytest.raises(ValueError):
+        engine.rewrite_many(texts, "pirate")
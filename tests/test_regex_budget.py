@@ -0,0 +1,81 @@
+import os
+import random
+import re
+import time
+import pytest
+from backend.app.extraction import Extractor
+
+
+BUDGET_SECONDS = float(os.getenv("MATCH_BUDGET_SECONDS", "0.5"))
+MESSAGE_CHARS = 100_000
+
+
+@pytest.fixture(scope="module")
+def extractor():
+    return Extractor()
+
+
+def time_scan(extractor, text, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        extractor.matcher.scan(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def repeat_to(chunk, size):
+    return (chunk * (size // len(chunk) + 1))[:size]
+
+
+ADVERSARIAL = {
+    "trigger_storm": "work hate brief prefer ",
+    "dangling_gap_prefixes": "struggling with working concise prefer-",
+    "single_line_log_dump": "2024-01-01T00:00:00Z worker-3 INFO prefer=1 work_queue=hate ",
+    "pet_names": "dog cat pet ",
+    "allergy_runs": "allergic to " + "a" * 500 + "1 ",
+    "no_word_starts": "a" * 1000,
+}
+
+
+def test_patterns_have_no_unbounded_gaps(extractor):
+    for pattern in list(extractor.patterns.values()) + list(extractor.emotional_keywords.values()):
+        assert not re.search(r"\.[*+]", pattern.pattern), pattern.pattern
+
+
+@pytest.mark.parametrize("gap, matches", [(0, True), (79, True), (80, True), (81, False), (500, False)])
+def test_pattern_gaps_are_bounded_at_80_characters(extractor, gap, matches):
+    text = "I hate" + " " * gap + "meeting"
+    found = ("preference", "hates meetings") in extractor.matcher.scan(text)
+    assert found is matches
+    assert bool(extractor.patterns["hates meetings"].search(text)) is matches
+
+
+@pytest.mark.parametrize("name", sorted(ADVERSARIAL))
+def test_adversarial_message_within_budget(extractor, name):
+    text = repeat_to(ADVERSARIAL[name], MESSAGE_CHARS)
+    assert time_scan(extractor, text) < BUDGET_SECONDS
+
+
+@pytest.mark.parametrize("name", sorted(ADVERSARIAL))
+def test_scan_time_grows_linearly(extractor, name):
+    small = time_scan(extractor, repeat_to(ADVERSARIAL[name], MESSAGE_CHARS // 4))
+    large = time_scan(extractor, repeat_to(ADVERSARIAL[name], MESSAGE_CHARS))
+    # 4x the input: linear stays near 4x, quadratic would be near 16x.
+    assert large < max(small, 1e-3) * 10
+
+
+def test_fuzzed_messages_within_budget(extractor):
+    rng = random.Random(1234)
+    vocabulary = [
+        trigger for triggers in list(extractor.pattern_triggers.values()) + list(extractor.emotion_triggers.values())
+        for trigger in triggers
+    ] + ["the", "and", "-", "late", "night", "meeting", "text", "to", "\n", "  "]
+
+    for _ in range(20):
+        words, size = [], 0
+        while size < MESSAGE_CHARS:
+            word = rng.choice(vocabulary)
+            words.append(word)
+            size += len(word) + 1
+        assert time_scan(extractor, " ".join(words), repeat=1) < BUDGET_SECONDS
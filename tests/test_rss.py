@@ -0,0 +1,29 @@
+import os
+import subprocess
+import sys
+import pytest
+from pathlib import Path
+from backend.app.rss import process_memory, report, format_report
+
+
+pytestmark = pytest.mark.skipif(not Path("/proc/self/smaps_rollup").exists(), reason="needs Linux /proc")
+
+
+def test_process_memory_reads_own_usage():
+    usage = process_memory(os.getpid())
+    assert usage["rss"] > 0
+    assert 0 < usage["pss"] <= usage["rss"]
+    assert usage["uss"] <= usage["rss"]
+
+
+def test_report_lists_children():
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(5)"])
+    try:
+        rows = report(os.getpid())
+    finally:
+        child.kill()
+        child.wait()
+    
+    assert rows[0]["role"] == "master"
+    assert child.pid in [row["pid"] for row in rows if row["role"] == "worker"]
+    assert "total PSS" in format_report(rows)
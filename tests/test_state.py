@@ -0,0 +1,98 @@
+import threading
+import time
+
+import pytest
+from backend.app.state import LOCK_STRIPES, ExtractionStateStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ExtractionStateStore(str(tmp_path / "state"))
+
+
+def test_load_missing_user_returns_none(store):
+    assert store.load("nobody") is None
+
+
+def test_save_and_load_round_trip(store):
+    state = {
+        "last_index": 4,
+        "seen_preferences": {"vegetarian:vegetarian"},
+        "seen_emotions": {"stress"},
+        "seen_facts": set(),
+        "memory": {"user_id": "alice", "preferences": []}
+    }
+    store.save("alice", state)
+    
+    loaded = store.load("alice")
+    assert loaded == state
+    assert isinstance(loaded["seen_emotions"], set)
+
+
+def test_user_ids_are_not_used_as_paths(store, tmp_path):
+    state = {"last_index": 0, "seen_preferences": set(), "seen_emotions": set(), "seen_facts": set(), "memory": {}}
+    store.save("../../escape", state)
+    
+    assert store.load("../../escape") == state
+    assert not (tmp_path / "escape").exists()
+
+
+def test_delete_removes_state(store):
+    state = {"last_index": 0, "seen_preferences": set(), "seen_emotions": set(), "seen_facts": set(), "memory": {}}
+    store.save("bob", state)
+    store.delete("bob")
+    
+    assert store.load("bob") is None
+
+
+def test_concurrent_saves_do_not_share_a_temp_file(store, tmp_path):
+    errors = []
+    
+    def save(worker):
+        state = {"last_index": worker, "seen_preferences": set(), "seen_emotions": set(), "seen_facts": set(), "memory": {}}
+        try:
+            for _ in range(50):
+                store.save("alice", state)
+        except OSError as e:
+            errors.append(e)
+    
+    threads = [threading.Thread(target=save, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert errors == []
+    assert store.load("alice")["last_index"] in range(8)
+    assert list((tmp_path / "state").glob("*.tmp")) == []
+
+
+def test_lock_is_held_across_store_instances(tmp_path):
+    # Two stores on one directory stand in for two worker processes.
+    first = ExtractionStateStore(str(tmp_path / "state"))
+    second = ExtractionStateStore(str(tmp_path / "state"))
+    acquired = []
+    
+    def wait_for_lock():
+        with second.lock("alice"):
+            acquired.append(time.perf_counter())
+    
+    with first.lock("alice"):
+        thread = threading.Thread(target=wait_for_lock)
+        thread.start()
+        time.sleep(0.2)
+        released = time.perf_counter()
+        assert acquired == []
+    thread.join()
+    
+    assert acquired[0] >= released
+    with second.lock("bob"):
+        pass
+
+
+def test_lock_pool_stays_bounded(tmp_path):
+    store = ExtractionStateStore(str(tmp_path / "state"))
+    for index in range(1000):
+        with store.lock(f"user-{index}"):
+            pass
+    assert len(store.locks) == LOCK_STRIPES
@@ -0,0 +1,147 @@
+import multiprocessing
+import os
+import threading
+
+import pytest
+from backend.app.store import LOCK_STRIPES, MemoryStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = MemoryStore(str(tmp_path / "memory.db"))
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def memory():
+    return {
+        "user_id": "alice",
+        "generated_at": "2026-01-01T00:00:00Z",
+        "preferences": [
+            {"category": "food", "value": "vegetarian", "confidence": 0.85, "source_messages": [2]},
+            {"category": "work_style", "value": "works late", "confidence": 0.85, "source_messages": [1]},
+            {"category": "food", "value": "tea lover", "confidence": 0.85, "source_messages": [7]}
+        ],
+        "emotional_patterns": [
+            {"pattern": "stress", "confidence": 0.8, "source_messages": [3]}
+        ],
+        "facts": [
+            {"fact_type": "location", "value": "Berlin", "confidence": 0.88, "source_messages": [3]},
+            {"fact_type": "person", "value": "Luna", "confidence": 0.88, "source_messages": [4]}
+        ],
+        "raw_extractions": [
+            {"text": "Berlin", "message_index": 3, "entity_type": "GPE"}
+        ]
+    }
+
+
+def test_save_and_load_round_trip(store, memory):
+    store.save(memory)
+    assert store.load("alice") == memory
+
+
+def test_load_unknown_user_returns_none(store):
+    assert store.load("nobody") is None
+
+
+def test_load_filters_by_indexed_keys(store, memory):
+    store.save(memory)
+    
+    loaded = store.load("alice", keys={"preferences": ["food"], "facts": ["location"]})
+    assert [p["value"] for p in loaded["preferences"]] == ["vegetarian", "tea lover"]
+    assert [f["value"] for f in loaded["facts"]] == ["Berlin"]
+    assert loaded["emotional_patterns"] == memory["emotional_patterns"]
+
+
+def test_load_only_requested_fields(store, memory):
+    store.save(memory)
+    
+    loaded = store.load("alice", fields=["preferences"])
+    assert loaded["preferences"] == memory["preferences"]
+    assert loaded["facts"] == []
+    assert loaded["raw_extractions"] == []
+
+
+def test_save_replaces_previous_memory(store, memory):
+    store.save(memory)
+    memory["preferences"] = memory["preferences"][:1]
+    store.save(memory)
+    
+    assert store.load("alice")["preferences"] == memory["preferences"]
+
+
+def test_users_are_isolated(store, memory):
+    store.save(memory)
+    store.save({**memory, "user_id": "bob", "preferences": []})
+    
+    assert store.user_ids() == ["alice", "bob"]
+    assert len(store.load("alice")["preferences"]) == 3
+    store.delete("bob")
+    assert store.load("bob") is None
+
+
+def save_in_child(store, memory, pids):
+    store.save({**memory, "user_id": "child"})
+    pids.put((os.getpid(), store.db._pid))
+
+
+def test_connection_is_opened_lazily_per_process(tmp_path, memory):
+    path = tmp_path / "memory.db"
+    store = MemoryStore(str(path))
+    assert not path.exists()
+    
+    store.save(memory)
+    parent_pid = store.db._pid
+    
+    context = multiprocessing.get_context("fork")
+    pids = context.Queue()
+    child = context.Process(target=save_in_child, args=(store, memory, pids))
+    child.start()
+    child.join()
+    
+    child_pid, connection_pid = pids.get(timeout=5)
+    assert connection_pid == child_pid != parent_pid
+    assert store.db._pid == parent_pid
+    assert store.load("child")["preferences"] == memory["preferences"]
+    store.close()
+
+
+def test_transactions_serialize_writers_on_separate_connections(tmp_path, memory):
+    # Separate store objects have separate connections, like worker processes.
+    path = str(tmp_path / "memory.db")
+    stores = [MemoryStore(path) for _ in range(4)]
+    stores[0].save({**memory, "preferences": []})
+    
+    def append(store, worker):
+        for round_ in range(10):
+            with store.transaction("alice") as conn:
+                current = store.load("alice", conn=conn)
+                current["preferences"].append({"category": "food", "value": f"{worker}-{round_}"})
+                store.save(current, conn=conn)
+    
+    threads = [threading.Thread(target=append, args=(store, worker)) for worker, store in enumerate(stores)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert len(stores[0].load("alice")["preferences"]) == 40
+    for store in stores:
+        store.close()
+
+
+def test_transaction_rolls_back_on_error(store, memory):
+    store.save(memory)
+    with pytest.raises(RuntimeError):
+        with store.transaction("alice") as conn:
+            store.save({**memory, "preferences": []}, conn=conn)
+            raise RuntimeError("validation failed")
+    assert store.load("alice")["preferences"] == memory["preferences"]
+
+
+def test_transaction_lock_pool_stays_bounded(store):
+    for index in range(1000):
+        with store.transaction(f"user-{index}"):
+            pass
+    assert len(store.user_locks) == LOCK_STRIPES